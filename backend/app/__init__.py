@@ -1,22 +1,62 @@
 # app/__init__.py
+import os
+from datetime import timedelta
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_login import LoginManager
-from werkzeug.security import generate_password_hash
+from flask_caching import Cache
+from flask_jwt_extended import JWTManager
+
+from .db_config import database_uri, engine_options, install_sqlite_pragmas, replica_binds
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+cache = Cache()
+jwt = JWTManager()
+
+def _running_flask_cli():
+    """True when the app is being built by the `flask` command line"""
+    import click
+    from flask.cli import FlaskGroup
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.find_root().command, FlaskGroup)
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
 
-    app.config['SECRET_KEY'] = 'your-secret-key'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key')
+    # Tokens are signed with JWT_SECRET_KEY when set, else SECRET_KEY
+    if os.environ.get('JWT_SECRET_KEY'):
+        app.config['JWT_SECRET_KEY'] = os.environ['JWT_SECRET_KEY']
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.environ.get('JWT_ACCESS_MINUTES', '15')))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.environ.get('JWT_REFRESH_DAYS', '30')))
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    app.config['SQLALCHEMY_BINDS'] = replica_binds()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['INIT_DB_ON_STARTUP'] = os.environ.get('INIT_DB_ON_STARTUP') == '1'
+    if config_overrides:
+        app.config.update(config_overrides)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
 
     db.init_app(app)
+    # Engines are built here without connecting, so the pragmas are in
+    # place before the first connection is opened
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine)
+    # Alembic costs ~150 ms to import and is only needed by `flask db`
+    if _running_flask_cli():
+        from flask_migrate import Migrate
+        Migrate(app, db, render_as_batch=True)
     login_manager.init_app(app)
+    jwt.init_app(app)
+
+    from .instrumentation import init_instrumentation
+    init_instrumentation(app, db)
+
+    from .services.lot_cache import init_cache
+    init_cache(app)
     
     # Enhanced CORS configuration
     CORS(app, 
@@ -24,7 +64,8 @@ def create_app():
          supports_credentials=True, 
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
          allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-         expose_headers=["Content-Type", "Authorization"])
+         expose_headers=["Content-Type", "Authorization", "X-Next-Cursor", "Content-Disposition",
+                         "X-Total-Count", "X-Active-Count", "X-Total-Cost", "X-Total-Hours"])
 
     # Remove the manual CORS headers since Flask-CORS handles them
     # @app.after_request
@@ -35,118 +76,15 @@ def create_app():
     #     response.headers.add('Access-Control-Allow-Credentials', 'true')
     #     return response
 
-    from .models import User, ParkingLot, ParkingSpot, Reservation
-
-    with app.app_context():
-        print("[INFO] Creating database tables if not exist...")
-        db.create_all()
-        print("[INFO] Database setup complete.")
-
-        # Default admin credentials
-        admin_username = 'anand'
-        admin_password = 'anand123'
-        admin_email = 'anand@admin.com'
-
-        admin = User.query.filter_by(username=admin_username).first()
-        hashed_password = generate_password_hash(admin_password, method='pbkdf2:sha256')
-
-        if admin:
-            # Update password/email if needed
-            admin.password = hashed_password
-            admin.email = admin_email
-            db.session.commit()
-            print(f"[INFO] Admin already exists. Password/Email updated for {admin.username}")
-        else:
-            try:
-                admin = User(
-                    username=admin_username,
-                    password=hashed_password,
-                    email=admin_email,
-                    role='admin'
-                )
-                db.session.add(admin)
-                db.session.commit()
-                print(f"[INFO] Default admin user created: {admin_username} / {admin_password} (hashed)")
-            except Exception as e:
-                print(f"[ERROR] Failed to create admin user: {e}")
-
-        # Create sample regular user
-        user_username = 'user'
-        user_password = 'user123'
-        user_email = 'user@example.com'
+    from . import models  # noqa: F401  registers the tables on db.metadata
 
-        user = User.query.filter_by(username=user_username).first()
-        user_hashed_password = generate_password_hash(user_password, method='pbkdf2:sha256')
-
-        if user:
-            # Update password/email if needed
-            user.password = user_hashed_password
-            user.email = user_email
-            db.session.commit()
-            print(f"[INFO] User already exists. Password/Email updated for {user.username}")
-        else:
-            try:
-                user = User(
-                    username=user_username,
-                    password=user_hashed_password,
-                    email=user_email,
-                    role='user'
-                )
-                db.session.add(user)
-                db.session.commit()
-                print(f"[INFO] Default user created: {user_username} / {user_password} (hashed)")
-            except Exception as e:
-                print(f"[ERROR] Failed to create user: {e}")
-
-        # Create sample parking lots and spots
-        print("[INFO] Creating sample parking lots and spots...")
-        
-        # Check if lots already exist
-        existing_lots = ParkingLot.query.all()
-        if not existing_lots:
-            try:
-                # Create sample parking lots
-                lot1 = ParkingLot(
-                    name='Central Mall Parking',
-                    address='123 Main Street, City Center',
-                    pin_code='123456',
-                    price_per_hour=50.0,
-                    total_spots=20
-                )
-                lot2 = ParkingLot(
-                    name='Downtown Plaza',
-                    address='456 Oak Avenue, Downtown',
-                    pin_code='654321',
-                    price_per_hour=40.0,
-                    total_spots=15
-                )
-                lot3 = ParkingLot(
-                    name='Airport Parking',
-                    address='789 Airport Road, Terminal 1',
-                    pin_code='789012',
-                    price_per_hour=80.0,
-                    total_spots=30
-                )
-                
-                db.session.add_all([lot1, lot2, lot3])
-                db.session.commit()
-                
-                # Create parking spots for each lot
-                lots = [lot1, lot2, lot3]
-                for lot in lots:
-                    for i in range(1, lot.total_spots + 1):
-                        spot = ParkingSpot(
-                            lot_id=lot.id,
-                            status='A'  # Available
-                        )
-                        db.session.add(spot)
-                
-                db.session.commit()
-                print(f"[INFO] Created {len(lots)} parking lots with spots")
-            except Exception as e:
-                print(f"[ERROR] Failed to create sample data: {e}")
-        else:
-            print(f"[INFO] {len(existing_lots)} parking lots already exist")
+    # Off by default so web workers and Celery processes start without
+    # touching the database; use `flask init-db` and `flask seed` instead
+    if app.config['INIT_DB_ON_STARTUP']:
+        from .seed import init_db, seed_defaults
+        with app.app_context():
+            init_db()
+            seed_defaults()
 
     # Register blueprints
     from .routes.auth_routes import auth_bp
@@ -157,5 +95,8 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(user_bp, url_prefix='/api/user')
 
+    from .commands import register_commands
+    register_commands(app)
+
     print("[INFO] Flask app setup complete.")
     return app
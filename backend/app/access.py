@@ -0,0 +1,42 @@
+# app/access.py
+from flask import request, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+# User endpoints that serve the same public data to everyone. The
+# availability stream is opened by EventSource, which cannot send headers.
+PUBLIC_USER_ENDPOINTS = {'user.available_lots', 'user.availability_stream'}
+
+
+def _requested_user_id():
+    """The user_id a request acts on: from the URL, the JSON body or the query string"""
+    if request.view_args and 'user_id' in request.view_args:
+        return request.view_args['user_id']
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and data.get('user_id') is not None:
+        return data['user_id']
+    return request.args.get('user_id')
+
+
+def require_user():
+    """
+    before_request hook for /api/user: require a valid access token.
+
+    A user may only act on their own user_id; admins may act on anyone's.
+    """
+    if request.method == 'OPTIONS' or request.endpoint in PUBLIC_USER_ENDPOINTS:
+        return None
+    verify_jwt_in_request()
+    user_id = _requested_user_id()
+    if user_id is not None and str(user_id) != get_jwt_identity() and get_jwt().get('role') != 'admin':
+        return jsonify({'message': 'Not allowed to access another user\'s data'}), 403
+    return None
+
+
+def require_admin():
+    """before_request hook for /api/admin: require an admin access token"""
+    if request.method == 'OPTIONS':
+        return None
+    verify_jwt_in_request()
+    if get_jwt().get('role') != 'admin':
+        return jsonify({'message': 'Admin access required'}), 403
+    return None
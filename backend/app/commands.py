@@ -0,0 +1,52 @@
+# app/commands.py
+import click
+
+
+def register_commands(app):
+    """Attach the maintenance CLI commands to the Flask app"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing tables."""
+        from app.seed import init_db
+
+        init_db()
+
+    @app.cli.command('seed')
+    @click.option('--reset-passwords', is_flag=True, help='Reset the default accounts to their default passwords.')
+    def seed_command(reset_passwords):
+        """Create the default accounts and sample lots if missing."""
+        from app.seed import seed_defaults
+
+        seed_defaults(reset_passwords=reset_passwords)
+
+    @app.cli.command('reconcile-lot-counts')
+    def reconcile_lot_counts_command():
+        """Recompute per-lot available/occupied counters from parking spots."""
+        from app.services.lot_cache import invalidate_lots
+        from app.services.lot_counters import reconcile_lot_counts
+
+        updated = reconcile_lot_counts()
+        invalidate_lots(lot_set_changed=True)
+        click.echo(f"[INFO] Reconciled counters for {updated} parking lots")
+
+    @app.cli.command('refresh-summaries')
+    @click.option('--full', is_flag=True, help='Rebuild from all reservations instead of resuming.')
+    def refresh_summaries_command(full):
+        """Update the per-user day/week/month reservation summaries."""
+        from app.services.period_summary import refresh_period_summaries
+
+        result = refresh_period_summaries(full=full)
+        click.echo(f"[INFO] Recomputed {result['days']} days and {result['periods']} weeks/months")
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        """Fail if a hot route's main query needs a full table scan."""
+        from app.query_plans import check_query_plans
+
+        failures = check_query_plans()
+        for name, lines in failures.items():
+            click.echo(f"[ERROR] {name} scans without an index: {'; '.join(lines)}")
+        if failures:
+            raise SystemExit(1)
+        click.echo("[INFO] All hot queries use an index")
@@ -0,0 +1,83 @@
+# app/db_config.py
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URI = 'sqlite:///database.db'
+
+# Flask-SQLAlchemy bind key of the optional read replica
+REPLICA_BIND = 'replica'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_uri():
+    """SQLALCHEMY_DATABASE_URI, or DATABASE_URL, or the local SQLite file"""
+    return os.environ.get('SQLALCHEMY_DATABASE_URI') or os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URI
+
+
+def replica_binds():
+    """
+    SQLALCHEMY_BINDS entry for the read replica named by
+    SQLALCHEMY_REPLICA_URI (or DATABASE_REPLICA_URL), if any.
+
+    No model uses the bind, so create_all and migrations never touch it;
+    only read_only_session() sends queries there.
+    """
+    uri = os.environ.get('SQLALCHEMY_REPLICA_URI') or os.environ.get('DATABASE_REPLICA_URL')
+    if not uri:
+        return {}
+    return {REPLICA_BIND: {'url': uri, **engine_options(uri)}}
+
+
+def engine_options(uri):
+    """
+    Engine keyword arguments for a database URI, tuned from the environment.
+
+    Server databases get a connection pool sized by DB_POOL_SIZE (10) and
+    DB_MAX_OVERFLOW (20), with pre-ping (DB_POOL_PRE_PING, on), recycling
+    after DB_POOL_RECYCLE seconds (1800) and DB_POOL_TIMEOUT seconds (30)
+    to wait for a free connection. SQLite only gets a lock wait: the
+    driver's timeout, matching SQLITE_BUSY_TIMEOUT_MS (5000).
+    """
+    if make_url(uri).get_backend_name() == 'sqlite':
+        return {'connect_args': {'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}}
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', '1'),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    }
+
+
+def install_sqlite_pragmas(engine):
+    """
+    Put every new SQLite connection in WAL mode with a busy timeout.
+
+    WAL lets readers run alongside the single writer instead of blocking
+    on it, and busy_timeout makes a writer wait for the lock rather than
+    fail at once with "database is locked". synchronous=NORMAL is the
+    recommended durability level for WAL.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    busy_timeout = _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    wal = _env_flag('SQLITE_WAL', '1') and engine.url.database not in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+        if wal:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.close()
@@ -0,0 +1,177 @@
+# app/instrumentation.py
+"""
+Per-request SQL and latency instrumentation.
+
+SQLAlchemy cursor events count and time every statement; Flask request
+hooks turn those numbers into per-endpoint histograms served on
+/metrics. SLOW_QUERY_MS (unset by default) logs statements slower than
+that many milliseconds. query_budget() lets tests and benchmarks fail
+when a block of code issues more statements than expected.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+from app.metrics import CONTENT_TYPE, registry
+from app.task_telemetry import render_task_metrics
+
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS') or 0)
+# Statements kept per tracker for budget failure messages
+MAX_RECORDED_STATEMENTS = 50
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+request_latency = registry.histogram(
+    'http_request_duration_seconds', 'Time to build the response, by endpoint',
+    ('endpoint', 'method', 'status'))
+request_queries = registry.histogram(
+    'http_request_queries', 'SQL statements issued per request', ('endpoint',), buckets=QUERY_BUCKETS)
+request_db_time = registry.histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request', ('endpoint',))
+response_size = registry.histogram(
+    'http_response_size_bytes', 'Response body size (streamed bodies excluded)', ('endpoint',), buckets=SIZE_BUCKETS)
+slow_queries = registry.counter(
+    'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', ('endpoint',))
+
+# Every QueryStats active in the current context; nested trackers all see each statement
+_trackers: ContextVar[tuple] = ContextVar('query_trackers', default=())
+
+
+class QueryStats:
+    """Statement count and cumulative SQL time for one tracked block"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append(statement)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block issued more SQL statements than its budget"""
+
+
+@contextmanager
+def track_queries():
+    """Count the statements executed inside the block"""
+    stats = QueryStats()
+    token = _trackers.set(_trackers.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _trackers.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """
+    Fail with QueryBudgetExceeded if the block runs more than
+    max_queries statements, listing them so N+1 patterns stand out:
+
+        with query_budget(3):
+            client.get('/api/user/history/1')
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = '\n'.join(f'  {statement}' for statement in stats.statements)
+        raise QueryBudgetExceeded(f'{stats.count} queries, budget is {max_queries}:\n{listing}')
+
+
+def _endpoint() -> str:
+    return (request.endpoint or 'unmatched') if has_request_context() else 'background'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    elapsed = time.perf_counter() - started
+    for stats in _trackers.get():
+        stats.record(statement, elapsed)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        endpoint = _endpoint()
+        slow_queries.inc(endpoint=endpoint)
+        slow_query_logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) in {endpoint}: {' '.join(statement.split())[:500]}")
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def _lot_metadata_samples():
+    from app.services.lot_metadata import lot_metadata
+    stats = lot_metadata.stats()
+    lines = []
+    for name in ('hits', 'misses', 'evictions', 'invalidations'):
+        metric = f'lot_metadata_cache_{name}_total'
+        lines += [f'# HELP {metric} Lot metadata cache {name} in this process', f'# TYPE {metric} counter',
+                  f'{metric} {stats[name]}']
+    return lines
+
+
+def init_instrumentation(app, db) -> None:
+    """Hook every engine and request of the app and serve /metrics"""
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def start_request_tracking():
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats()
+        g.query_stats_token = _trackers.set(_trackers.get() + (g.query_stats,))
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        endpoint = _endpoint()
+        request_latency.observe(time.perf_counter() - started,
+                                endpoint=endpoint, method=request.method, status=response.status_code)
+        request_queries.observe(g.query_stats.count, endpoint=endpoint)
+        request_db_time.observe(g.query_stats.seconds, endpoint=endpoint)
+        if not response.is_streamed and response.content_length is not None:
+            response_size.observe(response.content_length, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def stop_request_tracking(exc):
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            try:
+                _trackers.reset(token)
+            except ValueError:
+                # Streamed bodies can finish in another context; that context ends with them
+                pass
+
+    registry.register_collector(_lot_metadata_samples)
+    registry.register_collector(render_task_metrics)
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(registry.render(), content_type=CONTENT_TYPE))
@@ -6,7 +6,7 @@ from datetime import datetime
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(120), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # scrypt hashes are ~162 characters
     email = db.Column(db.String(120), unique=True)
     phone_number = db.Column(db.String(15), nullable=True)  # WhatsApp number
     role = db.Column(db.String(10), nullable=False)  # 'admin' or 'user'
@@ -19,6 +19,9 @@ class ParkingLot(db.Model):
     pin_code = db.Column(db.String(10), nullable=False)
     price_per_hour = db.Column(db.Float, nullable=False)
     total_spots = db.Column(db.Integer, nullable=False)
+    # Maintained by the booking/release/lot routes; see services/lot_counters.py
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    occupied_count = db.Column(db.Integer, nullable=False, default=0)
     spots = db.relationship('ParkingSpot', backref='lot', lazy=True)
 
 class ParkingSpot(db.Model):
@@ -27,6 +30,11 @@ class ParkingSpot(db.Model):
     status = db.Column(db.String(1), default='A')  # 'A' for Available, 'O' for Occupied
     reservations = db.relationship('Reservation', backref='spot', lazy=True)
 
+    __table_args__ = (
+        # Free-spot lookup in book_spot and the occupied check in delete_lot
+        db.Index('ix_parking_spot_lot_status', 'lot_id', 'status'),
+    )
+
 class Reservation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spot.id'), nullable=False)
@@ -34,3 +42,45 @@ class Reservation(db.Model):
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime, nullable=True)
     cost = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_reservation_user_start', 'user_id', 'start_time'),
+        db.Index('ix_reservation_user_end', 'user_id', 'end_time'),
+        db.Index('ix_reservation_end_time', 'end_time'),
+    )
+
+class NotificationOutbox(db.Model):
+    """Notification intents written in the same transaction as the reservation"""
+    id = db.Column(db.Integer, primary_key=True)
+    # One row per (kind, reservation); see services/notification_outbox.py
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    reservation_id = db.Column(db.Integer, db.ForeignKey('reservation.id'), nullable=False)
+    status = db.Column(db.String(1), nullable=False, default='P')  # 'P' pending, 'S' sent, 'F' failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # A worker's claim on the row; expired claims are picked up again
+    locked_until = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(200), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_id', 'status', 'id'),
+    )
+
+class UserPeriodSummary(db.Model):
+    """Per-user reservation totals per day, week and month; see services/period_summary.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period = db.Column(db.String(5), nullable=False)  # 'day', 'week' or 'month'
+    period_start = db.Column(db.Date, nullable=False)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    total_hours = db.Column(db.Float, nullable=False, default=0)
+    total_cost = db.Column(db.Float, nullable=False, default=0)
+    # Start of the refresh run that wrote the row; the next run resumes here
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', 'user_id', name='uq_user_period_summary'),
+        db.Index('ix_user_period_summary_user', 'user_id', 'period', 'period_start'),
+    )
@@ -0,0 +1,97 @@
+# app/pagination.py
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+
+from flask import request, jsonify
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def page_args(default_limit: int = DEFAULT_PAGE_SIZE):
+    """
+    Read keyset paging arguments from the query string.
+
+    ?after=<id> is the id of the last row the client already has and
+    ?limit=<n> caps the page size.
+
+    Returns:
+        (after, limit) where after is None for the first page
+
+    Raises:
+        ValueError: Either argument is not a positive integer
+    """
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', default_limit, type=int)
+    if (after is not None and after < 1) or not limit or limit < 1:
+        raise ValueError('after and limit must be positive integers')
+    return after, min(limit, MAX_PAGE_SIZE)
+
+
+def page_response(items, limit: int, cursor_key: str = 'id'):
+    """
+    Serialize one page of rows as a JSON array.
+
+    The caller fetches limit + 1 rows; if the extra row is present the page
+    is trimmed and the cursor for the next page is sent in X-Next-Cursor,
+    so existing clients that expect a bare array keep working.
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    response = jsonify(items)
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(items[-1][cursor_key])
+    return response
+
+
+def timestamp_arg(name: str):
+    """
+    Read an optional ISO timestamp from the query string.
+
+    Raises:
+        ValueError: The value is not an ISO timestamp
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid timestamp: {value}')
+
+
+def field_args(available: Iterable[str], required: str = 'id') -> List[str]:
+    """
+    Read ?fields=a,b,c: the fields each item should carry.
+
+    Defaults to every available field. The `required` field (the paging
+    cursor) is always included so the next page can be requested.
+
+    Raises:
+        ValueError: A requested field is not available
+    """
+    available = list(available)
+    requested = request.args.get('fields')
+    if not requested:
+        return available
+    fields = list(dict.fromkeys(f.strip() for f in requested.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if required not in fields:
+        fields.insert(0, required)
+    return fields
+
+
+def select_fields(columns: Dict, fields: List[str]) -> list:
+    """Labelled column expressions for a column-only select of `fields`"""
+    return [columns[field].label(field) for field in fields]
+
+
+def row_dicts(rows) -> List[dict]:
+    """Rows from a select_fields query as JSON-ready dicts (ISO timestamps)"""
+    return [
+        {key: value.isoformat() if isinstance(value, (date, datetime)) else value
+         for key, value in row._mapping.items()}
+        for row in rows
+    ]
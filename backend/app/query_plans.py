@@ -0,0 +1,83 @@
+# app/query_plans.py
+from datetime import datetime, timedelta
+
+from app.models import db
+from app.routes.admin_routes import occupied_spot_query, reservations_query, reservations_totals_query
+from app.routes.user_routes import active_reservation_query, history_page_query, history_totals_query
+from app.services.allocation import free_spot_query, open_reservation_query
+from app.services.period_summary import dirty_days_query
+from app.tasks.daily_reminder import reminder_query
+from app.tasks.monthly_report import REPORT_CHUNK_SIZE, monthly_report_query
+
+# Tables that grow without bound; a plain scan of either is a regression.
+LARGE_TABLES = ('parking_spot', 'reservation')
+
+
+def hot_queries():
+    """
+    The statements hot routes and tasks run, keyed by where they are used.
+
+    Each one comes from the same query function its route or task
+    executes, with representative arguments, so a change to the shipped
+    SQL changes what `flask check-query-plans` explains. A new hot path
+    should get a query function and an entry here.
+    """
+    now = datetime.utcnow()
+    return {
+        'user.book_spot': free_spot_query(1),
+        'user.release_spot': open_reservation_query(1),
+        'user.active_reservation': active_reservation_query(1),
+        'user.history': history_page_query(1),
+        'user.history.next_page': history_page_query(1, after=1000),
+        'user.history.totals': history_totals_query(1),
+        'admin.delete_lot': occupied_spot_query(1),
+        'admin.reservations': reservations_query(),
+        'admin.reservations.by_user': reservations_query(user_id=1),
+        'admin.reservations.totals': reservations_totals_query(),
+        'tasks.period_summary': dirty_days_query(now - timedelta(hours=1)),
+        'tasks.daily_reminder': reminder_query(now - timedelta(days=1)),
+        'tasks.monthly_report': monthly_report_query(now - timedelta(days=30), after=0, through=REPORT_CHUNK_SIZE),
+    }
+
+
+def explain(statement):
+    """Return the query plan lines for a statement on the current engine"""
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as connection:
+        if dialect.name == 'sqlite':
+            return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+        if dialect.name == 'postgresql':
+            # Small tables make sequential scans cheaper than any index;
+            # disabling them shows whether an index path exists at all.
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            return [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {sql}')]
+    raise NotImplementedError(f'No plan check for dialect {dialect.name}')
+
+
+def full_scans(plan):
+    """Pick out plan lines that read a large table without an index"""
+    offending = []
+    for line in plan:
+        for table in LARGE_TABLES:
+            if line.startswith(f'SCAN {table}') and 'INDEX' not in line:
+                offending.append(line)
+            elif line.strip().startswith('Seq Scan') and f' on {table}' in line:
+                offending.append(line.strip())
+    return offending
+
+
+def check_query_plans():
+    """
+    Explain every hot query and collect the ones that fall back to a
+    full table scan.
+
+    Returns:
+        Dict of query name -> offending plan lines (empty when all pass)
+    """
+    failures = {}
+    for name, statement in hot_queries().items():
+        offending = full_scans(explain(statement))
+        if offending:
+            failures[name] = offending
+    return failures
@@ -1,8 +1,35 @@
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash
-from app.models import db, ParkingLot, ParkingSpot, User, Reservation
+from sqlalchemy import Float, Numeric, case, cast, func, select, union_all
+from app.access import require_admin
+from app.models import db, ParkingLot, ParkingSpot, User, Reservation, NotificationOutbox, UserPeriodSummary
+from app.pagination import DEFAULT_PAGE_SIZE, field_args, page_args, page_response, row_dicts, select_fields, timestamp_arg
+from app.services.availability_stream import publish_lot_availability
+from app.services.lot_provisioning import create_lot, create_lots, parse_lots, resize_lot, LotResizeError
+from app.services.lot_cache import cached_lot_listing, invalidate_lots
+from app.services.lot_metadata import lot_metadata
+from app.services.passwords import hash_password
+from app.services.period_summary import reservation_hours
+from app.services.read_session import read_only_session
+from app.services.reservation_export import csv_response
 
 admin_bp = Blueprint('admin', __name__)
+admin_bp.before_request(require_admin)
+
+# Fields each listing can return via ?fields=, mapped to the columns they are read from
+LOT_LISTING_FIELDS = {
+    'id': ParkingLot.id,
+    'name': ParkingLot.name,
+    'address': ParkingLot.address,
+    'price_per_hour': ParkingLot.price_per_hour,
+    'total_spots': ParkingLot.total_spots,
+}
+
+USER_LISTING_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email,
+}
 
 # Test endpoint to verify backend is working
 @admin_bp.route('/test', methods=['GET'])
@@ -14,36 +41,81 @@ def test_endpoint():
 @admin_bp.route('/create-lot', methods=['POST'])
 def create_parking_lot():
     data = request.get_json()
-    lot = ParkingLot(
-        name=data['name'],
-        address=data['address'],
-        pin_code=data['pin_code'],
-        price_per_hour=data['price_per_hour'],
-        total_spots=data['total_spots']
-    )
-    db.session.add(lot)
-    db.session.flush()
+    lot = create_lot(data)
+    db.session.commit()
+    invalidate_lots(lot.id, lot_set_changed=True)
+    publish_lot_availability(lot.id)
+    return jsonify({'message': 'Parking lot and spots created successfully'}), 201
 
-    for _ in range(lot.total_spots):
-        spot = ParkingSpot(lot_id=lot.id)
-        db.session.add(spot)
+@admin_bp.route('/lots/import', methods=['POST'])
+def import_parking_lots():
+    """Create many lots at once from a JSON list or a CSV body/file upload"""
+    upload = request.files.get('file')
+    try:
+        if upload:
+            lots_data = parse_lots(upload.read().decode('utf-8-sig'), 'text/csv')
+        elif request.mimetype == 'text/csv':
+            lots_data = parse_lots(request.get_data(as_text=True), 'text/csv')
+        else:
+            lots_data = parse_lots(request.get_json(silent=True), 'application/json')
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
 
+    lots = create_lots(lots_data)
     db.session.commit()
-    return jsonify({'message': 'Parking lot and spots created successfully'}), 201
+    lot_ids = [lot.id for lot in lots]
+    invalidate_lots(*lot_ids, lot_set_changed=True)
+    publish_lot_availability(*lot_ids)
+    return jsonify({
+        'message': f'{len(lots)} parking lots created',
+        'lot_ids': lot_ids,
+        'spots': sum(lot.total_spots for lot in lots)
+    }), 201
+
+@admin_bp.route('/lots/<int:lot_id>', methods=['PUT'])
+def update_lot(lot_id):
+    """Edit lot details; a new total_spots adds or removes free spots"""
+    lot = ParkingLot.query.get(lot_id)
+    if not lot:
+        return jsonify({'message': 'Lot not found'}), 404
+
+    data = request.get_json() or {}
+    for field in ('name', 'address', 'pin_code', 'price_per_hour'):
+        if field in data:
+            setattr(lot, field, data[field])
+
+    if 'total_spots' in data:
+        total_spots = data['total_spots']
+        if not isinstance(total_spots, int) or total_spots < 1:
+            return jsonify({'message': 'total_spots must be a positive integer'}), 400
+        try:
+            resize_lot(lot, total_spots)
+        except LotResizeError as e:
+            db.session.rollback()
+            return jsonify({'message': f'Cannot shrink lot: {e}'}), 409
+
+    db.session.commit()
+    invalidate_lots(lot.id)
+    lot_metadata.invalidate(lot.id)
+    publish_lot_availability(lot.id)
+    return jsonify({'message': 'Lot updated', 'total_spots': lot.total_spots}), 200
 
 @admin_bp.route('/lots', methods=['GET'])
+@cached_lot_listing
 def view_lots():
-    lots = ParkingLot.query.all()
-    result = []
-    for lot in lots:
-        result.append({
-            'id': lot.id,
-            'name': lot.name,
-            'address': lot.address,
-            'price_per_hour': lot.price_per_hour,
-            'total_spots': lot.total_spots
-        })
-    return jsonify(result)
+    """List lots by id, paged by ?after/?limit, projected by ?fields"""
+    try:
+        after, limit = page_args()
+        fields = field_args(LOT_LISTING_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = select(*select_fields(LOT_LISTING_FIELDS, fields))
+    if after:
+        query = query.where(ParkingLot.id > after)
+    with read_only_session() as session:
+        lots = session.execute(query.order_by(ParkingLot.id).limit(limit + 1)).all()
+    return page_response(row_dicts(lots), limit)
 
 @admin_bp.route('/delete-lot/<int:lot_id>', methods=['DELETE'])
 def delete_lot(lot_id):
@@ -51,97 +123,182 @@ def delete_lot(lot_id):
     if not lot:
         return jsonify({'message': 'Lot not found'}), 404
 
-    occupied = ParkingSpot.query.filter_by(lot_id=lot.id, status='O').first()
+    occupied = db.session.execute(occupied_spot_query(lot.id)).first()
     if occupied:
         return jsonify({'message': 'Cannot delete lot. Some spots are still occupied.'}), 400
 
     ParkingSpot.query.filter_by(lot_id=lot.id).delete()
     db.session.delete(lot)
     db.session.commit()
+    invalidate_lots(lot_id, lot_set_changed=True)
+    lot_metadata.invalidate(lot_id)
+    publish_lot_availability(lot_id)
     return jsonify({'message': 'Lot deleted'}), 200
 
+def occupied_spot_query(lot_id):
+    """Any occupied spot in the lot; deleting the lot is refused while one exists"""
+    return select(ParkingSpot.id).where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'O').limit(1)
+
+@admin_bp.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of this process's lot metadata cache"""
+    return jsonify({'lot_metadata': lot_metadata.stats()})
+
 @admin_bp.route('/spot-status', methods=['GET'])
+@cached_lot_listing
 def view_all_spots_status():
-    lots = ParkingLot.query.all()
+    with read_only_session() as session:
+        lots = session.execute(
+            select(ParkingLot.id, ParkingLot.name, ParkingLot.total_spots,
+                   ParkingLot.available_count, ParkingLot.occupied_count)
+        ).all()
     data = []
     for lot in lots:
-        spots = ParkingSpot.query.filter_by(lot_id=lot.id).all()
-        available = sum(1 for s in spots if s.status == 'A')
-        occupied = sum(1 for s in spots if s.status == 'O')
         data.append({
+            'lot_id': lot.id,
             'lot_name': lot.name,
             'total_spots': lot.total_spots,
-            'available': available,
-            'occupied': occupied
+            'available': lot.available_count,
+            'occupied': lot.occupied_count
         })
     return jsonify(data)
 
 @admin_bp.route('/reservations', methods=['GET'])
 def view_all_reservations():
-    """Get all current and recent reservations with detailed information"""
+    """
+    List reservations with lot and user details in one joined query.
+
+    Defaults to active reservations plus those completed in the last
+    ?recent_hours (24). Optional filters: lot_id, user_id,
+    status=active|completed, and from/to (ISO timestamps on start_time),
+    which replace the active-or-recent default. Paged by ?after/?limit
+    and projected by ?fields. The first page also carries totals for the
+    whole filtered listing in X-Total-Count, X-Active-Count and
+    X-Total-Cost.
+    """
+    columns = _reservation_fields()
     try:
-        # Get all active reservations (ongoing)
-        active_reservations = Reservation.query.filter_by(end_time=None).all()
-        print(f"[DEBUG] Found {len(active_reservations)} active reservations")
-        
-        # Get recent completed reservations (last 24 hours)
-        from datetime import datetime, timedelta
-        yesterday = datetime.utcnow() - timedelta(hours=24)
-        recent_reservations = Reservation.query.filter(
-            Reservation.end_time >= yesterday
-        ).all()
-        print(f"[DEBUG] Found {len(recent_reservations)} recent reservations")
-        
-        # Combine and format data
-        all_reservations = active_reservations + recent_reservations
-        data = []
-        
-        for res in all_reservations:
-            try:
-                spot = ParkingSpot.query.get(res.spot_id)
-                if not spot:
-                    print(f"[WARNING] Spot {res.spot_id} not found for reservation {res.id}")
-                    continue
-                    
-                lot = ParkingLot.query.get(spot.lot_id)
-                if not lot:
-                    print(f"[WARNING] Lot not found for spot {res.spot_id}")
-                    continue
-                    
-                user = User.query.get(res.user_id)
-                if not user:
-                    print(f"[WARNING] User {res.user_id} not found for reservation {res.id}")
-                    continue
-                
-                data.append({
-                    'reservation_id': res.id,
-                    'lot_name': lot.name,
-                    'spot_id': res.spot_id,
-                    'user_username': user.username,
-                    'user_email': user.email,
-                    'start_time': res.start_time.isoformat(),
-                    'end_time': res.end_time.isoformat() if res.end_time else None,
-                    'cost': res.cost,
-                    'status': 'Active' if res.end_time is None else 'Completed',
-                    'duration_hours': round((res.end_time - res.start_time).total_seconds() / 3600, 2) if res.end_time else None
-                })
-            except Exception as e:
-                print(f"[ERROR] Error processing reservation {res.id}: {e}")
-                continue
-        
-        print(f"[DEBUG] Returning {len(data)} formatted reservations")
-        return jsonify(data)
-        
+        after, limit = page_args()
+        fields = field_args(columns, required='reservation_id')
+        lot_id = request.args.get('lot_id', type=int)
+        user_id = request.args.get('user_id', type=int)
+        status = request.args.get('status')
+        recent_hours = request.args.get('recent_hours', 24, type=int)
+        window_from = timestamp_arg('from')
+        window_to = timestamp_arg('to')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filters = {
+        'lot_id': lot_id, 'user_id': user_id, 'status': status,
+        'recent_hours': recent_hours, 'window_from': window_from, 'window_to': window_to,
+    }
+    try:
+        with read_only_session() as session:
+            rows = session.execute(reservations_query(fields, after, limit, **filters)).all()
+            totals = None
+            if not after:
+                totals = session.execute(reservations_totals_query(**filters)).one()
     except Exception as e:
-        print(f"[ERROR] Error in view_all_reservations: {e}")
         return jsonify({'error': str(e)}), 500
 
+    response = page_response(row_dicts(rows), limit, cursor_key='reservation_id')
+    if totals:
+        count, active, cost = totals
+        response.headers['X-Total-Count'] = str(count)
+        response.headers['X-Active-Count'] = str(active)
+        response.headers['X-Total-Cost'] = f'{cost:.2f}'
+    return response
+
+def _reservations_query(columns, lot_id=None, user_id=None, status=None, recent_hours=24,
+                        window_from=None, window_to=None):
+    """The filtered admin reservation listing, joined to lot and user"""
+    query = (
+        select(*columns)
+        .select_from(Reservation)
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .join(User, User.id == Reservation.user_id)
+    )
+
+    if window_from or window_to:
+        if window_from:
+            query = query.where(Reservation.start_time >= window_from)
+        if window_to:
+            query = query.where(Reservation.start_time < window_to)
+    else:
+        # Two end_time index lookups; as a plain OR, planners walk the whole table by id instead
+        recent_since = datetime.utcnow() - timedelta(hours=recent_hours)
+        query = query.where(Reservation.id.in_(union_all(
+            select(Reservation.id).where(Reservation.end_time.is_(None)),
+            select(Reservation.id).where(Reservation.end_time >= recent_since)
+        )))
+
+    if lot_id:
+        query = query.where(ParkingSpot.lot_id == lot_id)
+    if user_id:
+        query = query.where(Reservation.user_id == user_id)
+    if status == 'active':
+        query = query.where(Reservation.end_time.is_(None))
+    elif status == 'completed':
+        query = query.where(Reservation.end_time.is_not(None))
+    return query
+
+def reservations_query(fields=None, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """One page of the admin reservation listing, newest first, plus one row to detect a next page"""
+    columns = _reservation_fields()
+    query = _reservations_query(select_fields(columns, fields or list(columns)), **filters)
+    if after:
+        query = query.where(Reservation.id < after)
+    return query.order_by(Reservation.id.desc()).limit(limit + 1)
+
+def reservations_totals_query(**filters):
+    """Count, active count and cost of the whole filtered listing"""
+    return _reservations_query([
+        func.count(Reservation.id),
+        func.count(Reservation.id).filter(Reservation.end_time.is_(None)),
+        func.coalesce(func.sum(Reservation.cost), 0)
+    ], **filters)
+
+def _reservation_fields():
+    # Status and duration are computed by the database, so every field is a column
+    duration = func.round(cast(reservation_hours(), Numeric), 2, type_=Float)
+    return {
+        'reservation_id': Reservation.id,
+        'lot_name': ParkingLot.name,
+        'spot_id': Reservation.spot_id,
+        'user_username': User.username,
+        'user_email': User.email,
+        'start_time': Reservation.start_time,
+        'end_time': Reservation.end_time,
+        'cost': Reservation.cost,
+        'status': case((Reservation.end_time.is_(None), 'Active'), else_='Completed'),
+        'duration_hours': case((Reservation.end_time.is_not(None), duration)),
+    }
+
+@admin_bp.route('/export-csv', methods=['GET'])
+def export_all_reservations():
+    """Stream every reservation as CSV (?gzip=1 for a compressed download)"""
+    compress = bool(request.args.get('gzip', type=int))
+    return csv_response(compress=compress, filename='all_reservations')
+
 # ------------------------ User Management (Admin Only) ------------------------
 
 @admin_bp.route('/users', methods=['GET'])
 def view_users():
-    users = User.query.filter_by(role='user').all()
-    return jsonify([{'id': u.id, 'username': u.username, 'email': u.email} for u in users])
+    """List users by id, paged by ?after/?limit, projected by ?fields"""
+    try:
+        after, limit = page_args()
+        fields = field_args(USER_LISTING_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = select(*select_fields(USER_LISTING_FIELDS, fields)).where(User.role == 'user')
+    if after:
+        query = query.where(User.id > after)
+    with read_only_session() as session:
+        users = session.execute(query.order_by(User.id).limit(limit + 1)).all()
+    return page_response(row_dicts(users), limit)
 
 @admin_bp.route('/users', methods=['POST'])
 def create_user():
@@ -153,7 +310,7 @@ def create_user():
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'message': 'Username already exists'}), 409
 
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hash_password(data['password'])
 
     new_user = User(
         username=data['username'],
@@ -185,7 +342,12 @@ def delete_user(user_id):
     if not user or user.role != 'user':
         return jsonify({'message': 'User not found or not deletable'}), 404
 
+    # Outbox rows reference the reservations about to go
+    NotificationOutbox.query.filter(
+        NotificationOutbox.reservation_id.in_(select(Reservation.id).where(Reservation.user_id == user.id))
+    ).delete(synchronize_session=False)
     Reservation.query.filter_by(user_id=user.id).delete()
+    UserPeriodSummary.query.filter_by(user_id=user.id).delete()
     db.session.delete(user)
     db.session.commit()
     return jsonify({'message': 'User deleted successfully'}), 200
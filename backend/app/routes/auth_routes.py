@@ -1,17 +1,21 @@
 # app/routes/auth_routes.py
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, jwt_required
 from app.models import db, User
+from app.services.passwords import hash_password, verify_password
 
 auth_bp = Blueprint('auth', __name__)
 
+def _access_token(user):
+    return create_access_token(identity=str(user.id), additional_claims={'role': user.role})
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'message': 'Username already exists'}), 409
 
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hash_password(data['password'])
     new_user = User(
         username=data['username'],
         password=hashed_password,
@@ -27,6 +31,22 @@ def register():
 def login():
     data = request.get_json()
     user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password, data['password']):
-        return jsonify({'message': 'Login successful', 'role': user.role, 'user_id': user.id})
+    if user and verify_password(user, data['password']):
+        db.session.commit()  # keeps a rehash made with new PASSWORD_HASH_METHOD settings
+        return jsonify({
+            'message': 'Login successful',
+            'role': user.role,
+            'user_id': user.id,
+            'access_token': _access_token(user),
+            'refresh_token': create_refresh_token(identity=str(user.id))
+        })
     return jsonify({'message': 'Invalid credentials'}), 401
+
+# Swap a refresh token for a new access token without checking the password again
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    user = db.session.get(User, int(get_jwt_identity()))
+    if not user:
+        return jsonify({'message': 'User no longer exists'}), 401
+    return jsonify({'role': user.role, 'user_id': user.id, 'access_token': _access_token(user)})
@@ -1,27 +1,65 @@
 # app/routes/user_routes.py
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, Response, request, jsonify, send_file
+from app.access import require_user
 from app.models import db, ParkingLot, ParkingSpot, Reservation, User
-from datetime import datetime
+from app.pagination import DEFAULT_PAGE_SIZE, field_args, page_args, page_response, row_dicts, select_fields, timestamp_arg
+from app.services.availability_stream import availability_snapshot, broadcaster, event_stream, publish_lot_availability
+from app.services.allocation import allocate_spot, release_reservation, NoSpotAvailable, ActiveReservationExists, NoActiveReservation
+from app.services.lot_cache import cached_lot_listing, invalidate_lots
+from app.services.notification_outbox import enqueue_notification, BOOKING_CONFIRMATION, SPOT_RELEASED
+from app.services.period_summary import reservation_hours
+from app.services.read_session import pin_to_primary, read_only_session
+from app.services.reservation_export import csv_response, export_query, iter_rows
+from sqlalchemy import func, select
 
 user_bp = Blueprint('user', __name__)
+user_bp.before_request(require_user)
+
+# Fields a history item can carry via ?fields=
+HISTORY_FIELDS = {
+    'reservation_id': Reservation.id,
+    'spot_id': Reservation.spot_id,
+    'lot_name': ParkingLot.name,
+    'start_time': Reservation.start_time,
+    'end_time': Reservation.end_time,
+    'cost': Reservation.cost,
+}
 
 # View available parking lots with at least 1 free spot
 @user_bp.route('/available-lots', methods=['GET'])
+@cached_lot_listing
 def available_lots():
-    lots = ParkingLot.query.all()
+    lots = ParkingLot.query.filter(ParkingLot.available_count > 0).all()
     available = []
     for lot in lots:
-        spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').all()
-        if spots:
-            available.append({
-                'id': lot.id,
-                'name': lot.name,
-                'address': lot.address,
-                'price_per_hour': lot.price_per_hour,
-                'available_spots': len(spots)
-            })
+        available.append({
+            'id': lot.id,
+            'name': lot.name,
+            'address': lot.address,
+            'price_per_hour': lot.price_per_hour,
+            'available_spots': lot.available_count
+        })
     return jsonify(available)
 
+# Stream per-lot availability updates (Server-Sent Events)
+@user_bp.route('/availability-stream', methods=['GET'])
+def availability_stream():
+    # Subscribe before taking the snapshot so no update falls in between
+    queue = broadcaster.subscribe()
+    if queue is None:
+        return jsonify({'message': 'Too many open availability streams, retry later'}), 503, {'Retry-After': '30'}
+    try:
+        snapshot = availability_snapshot()
+    except Exception:
+        broadcaster.unsubscribe(queue)
+        raise
+
+    return Response(event_stream(queue, snapshot), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # Book the first available spot from selected lot
 @user_bp.route('/book', methods=['POST'])
 def book_spot():
@@ -29,174 +67,168 @@ def book_spot():
     lot_id = data['lot_id']
     user_id = data['user_id']
 
-    spot = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
-    if not spot:
+    try:
+        reservation = allocate_spot(lot_id, user_id)
+        enqueue_notification(BOOKING_CONFIRMATION, reservation.id)
+        db.session.commit()
+    except NoSpotAvailable:
+        db.session.rollback()
         return jsonify({'message': 'No available spots in this lot'}), 404
+    except ActiveReservationExists:
+        db.session.rollback()
+        return jsonify({'message': 'You already have an active reservation'}), 409
 
-    # Get user and lot information for notification
-    user = User.query.get(user_id)
-    lot = ParkingLot.query.get(lot_id)
+    invalidate_lots(lot_id)
+    publish_lot_availability(lot_id)
+    pin_to_primary(user_id)
 
-    # Mark as occupied
-    spot.status = 'O'
-    reservation = Reservation(
-        spot_id=spot.id,
-        user_id=user_id,
-        start_time=datetime.utcnow()
-    )
-    db.session.add(reservation)
-    db.session.commit()
-    
-    # Send WhatsApp notification if user has phone number
-    if user and user.phone_number and user.phone_number.strip() and user.phone_number.strip() != 'None' and lot:
-        try:
-            from app.services.whatsapp_service import WhatsAppService
-            whatsapp = WhatsAppService()
-            
-            result = whatsapp.send_booking_confirmation(
-                phone_number=user.phone_number,
-                username=user.username,
-                lot_name=lot.name,
-                spot_id=spot.id,
-                start_time=reservation.start_time.strftime('%Y-%m-%d %H:%M:%S')
-            )
-            
-            if result['success']:
-                print(f"📱 WhatsApp booking confirmation sent to {user.username}")
-            else:
-                print(f"❌ WhatsApp booking confirmation failed for {user.username}: {result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            print(f"⚠️ Could not send WhatsApp booking confirmation: {e}")
-    elif user and not user.phone_number:
-        print(f"📧 Booking confirmation for {user.username}: No WhatsApp number available")
-    
-    return jsonify({'message': 'Spot booked', 'spot_id': spot.id}), 200
+    return jsonify({'message': 'Spot booked', 'spot_id': reservation.spot_id}), 200
 
 # Release a spot and calculate cost
 @user_bp.route('/release', methods=['POST'])
 def release_spot():
     data = request.get_json()
     user_id = data['user_id']
-    
-    # Get ongoing reservation
-    reservation = Reservation.query.filter_by(user_id=user_id, end_time=None).first()
-    if not reservation:
+
+    try:
+        released = release_reservation(user_id)
+        # Delivered by the outbox worker once this transaction commits
+        enqueue_notification(SPOT_RELEASED, released.id)
+        db.session.commit()
+    except NoActiveReservation:
+        db.session.rollback()
         return jsonify({'message': 'No active reservation found'}), 404
 
-    reservation.end_time = datetime.utcnow()
-    
-    # Calculate cost
-    duration = (reservation.end_time - reservation.start_time).total_seconds() / 3600
-    spot = ParkingSpot.query.get(reservation.spot_id)
-    lot = ParkingLot.query.get(spot.lot_id)
-    reservation.cost = round(duration * lot.price_per_hour, 2)
-
-    # Mark spot as available
-    spot.status = 'A'
-    db.session.commit()
-    
-    # Send WhatsApp notification if user has phone number
-    user = User.query.get(user_id)
-    if user and user.phone_number and user.phone_number.strip() and user.phone_number.strip() != 'None' and lot:
-        try:
-            from app.services.whatsapp_service import WhatsAppService
-            whatsapp = WhatsAppService()
-            
-            result = whatsapp.send_spot_released(
-                phone_number=user.phone_number,
-                username=user.username,
-                lot_name=lot.name,
-                spot_id=spot.id,
-                cost=reservation.cost,
-                duration=duration
-            )
-            
-            if result['success']:
-                print(f"📱 WhatsApp spot release notification sent to {user.username}")
-            else:
-                print(f"❌ WhatsApp spot release notification failed for {user.username}: {result.get('error', 'Unknown error')}")
-                
-        except Exception as e:
-            print(f"⚠️ Could not send WhatsApp spot release notification: {e}")
-    elif user and not user.phone_number:
-        print(f"📧 Spot release notification for {user.username}: No WhatsApp number available")
-
-    return jsonify({'message': 'Spot released', 'cost': reservation.cost}), 200
+    invalidate_lots(released.lot_id)
+    publish_lot_availability(released.lot_id)
+    pin_to_primary(user_id)
+
+    return jsonify({'message': 'Spot released', 'cost': released.cost}), 200
 
 # View user's past reservations
 @user_bp.route('/history/<int:user_id>', methods=['GET'])
 def reservation_history(user_id):
-    history = Reservation.query.filter_by(user_id=user_id).all()
-    data = []
-    for res in history:
-        lot = ParkingLot.query.get(ParkingSpot.query.get(res.spot_id).lot_id)
-        data.append({
-            'spot_id': res.spot_id,
-            'lot_name': lot.name,
-            'start_time': res.start_time.isoformat() if res.start_time else None,
-            'end_time': res.end_time.isoformat() if res.end_time else None,
-            'cost': res.cost
-        })
-    return jsonify(data)
+    """
+    The user's reservations, newest first, from one joined query.
+
+    Optional filters: from/to (ISO timestamps on start_time) and lot_id.
+    Paged by ?after/?limit and projected by ?fields. The first page also
+    carries totals for the whole filtered history, summed by the database,
+    in X-Total-Count, X-Active-Count, X-Total-Cost and X-Total-Hours. Reservations whose
+    spot or lot has since been deleted are kept, with a null lot_name.
+    """
+    try:
+        after, limit = page_args()
+        fields = field_args(HISTORY_FIELDS, required='reservation_id')
+        window_from = timestamp_arg('from')
+        window_to = timestamp_arg('to')
+        lot_id = request.args.get('lot_id', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filters = {'window_from': window_from, 'window_to': window_to, 'lot_id': lot_id}
+    with read_only_session(user_id=user_id) as session:
+        rows = session.execute(history_page_query(user_id, fields, after, limit, **filters)).all()
+        totals = None
+        if not after:
+            totals = session.execute(history_totals_query(user_id, **filters)).one()
+
+    response = page_response(row_dicts(rows), limit, cursor_key='reservation_id')
+    if totals:
+        count, active, cost, hours = totals
+        response.headers['X-Total-Count'] = str(count)
+        response.headers['X-Active-Count'] = str(active)
+        response.headers['X-Total-Cost'] = f'{cost:.2f}'
+        response.headers['X-Total-Hours'] = f'{hours:.2f}'
+    return response
+
+def _history_query(user_id, columns, window_from=None, window_to=None, lot_id=None):
+    """A user's reservations, outer-joined so those of deleted spots and lots are kept"""
+    query = (
+        select(*columns)
+        .select_from(Reservation)
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(Reservation.user_id == user_id)
+    )
+    if window_from:
+        query = query.where(Reservation.start_time >= window_from)
+    if window_to:
+        query = query.where(Reservation.start_time < window_to)
+    if lot_id:
+        query = query.where(ParkingSpot.lot_id == lot_id)
+    return query
+
+def history_page_query(user_id, fields=None, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """One history page, newest first, plus one row to tell whether another page follows"""
+    query = _history_query(user_id, select_fields(HISTORY_FIELDS, fields or list(HISTORY_FIELDS)), **filters)
+    if after:
+        query = query.where(Reservation.id < after)
+    return query.order_by(Reservation.id.desc()).limit(limit + 1)
+
+def history_totals_query(user_id, **filters):
+    """Count, active count, cost and hours of the user's whole filtered history"""
+    return _history_query(user_id, [
+        func.count(Reservation.id),
+        func.count(Reservation.id).filter(Reservation.end_time.is_(None)),
+        func.coalesce(func.sum(Reservation.cost), 0),
+        func.coalesce(func.sum(reservation_hours()), 0)
+    ], **filters)
+
+def active_reservation_query(user_id):
+    """The user's open reservation with its lot name"""
+    return (
+        select(Reservation.id, Reservation.spot_id, Reservation.start_time, Reservation.cost, ParkingLot.name)
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(Reservation.user_id == user_id, Reservation.end_time.is_(None))
+    )
 
 # Get user's active reservation
 @user_bp.route('/active-reservation/<int:user_id>', methods=['GET'])
 def get_active_reservation(user_id):
-    active_reservation = Reservation.query.filter_by(user_id=user_id, end_time=None).first()
+    # Replica-safe: right after a booking or release the user is pinned to the primary
+    with read_only_session(user_id=user_id) as session:
+        active_reservation = session.execute(active_reservation_query(user_id)).first()
     
     if not active_reservation:
         return jsonify({'message': 'No active reservation found'}), 404
     
-    spot = ParkingSpot.query.get(active_reservation.spot_id)
-    lot = ParkingLot.query.get(spot.lot_id)
-    
     data = {
         'reservation_id': active_reservation.id,
         'spot_id': active_reservation.spot_id,
-        'lot_name': lot.name,
+        'lot_name': active_reservation.name,
         'start_time': active_reservation.start_time.isoformat(),
         'cost': active_reservation.cost
     }
     
     return jsonify(data)
 
-# Export user's reservation history as CSV
+# Export user's reservation history (JSON for the dashboard, or a CSV download)
 @user_bp.route('/export-csv', methods=['POST', 'OPTIONS'])
 def export_csv():
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
         return '', 200
     
-    data = request.get_json()
-    user_id = data.get('user_id')
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id') or request.args.get('user_id', type=int)
+    export_format = data.get('format') or request.args.get('format', 'json')
     
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
     
+    if export_format == 'csv':
+        compress = bool(data.get('gzip') or request.args.get('gzip', type=int))
+        return csv_response(user_id, compress=compress, filename=f'parking_history_user_{user_id}')
+    
     try:
-        # Get user's reservation history
-        reservations = Reservation.query.filter_by(user_id=user_id).all()
+        with read_only_session(user_id=user_id) as session:
+            csv_data = list(iter_rows(session, export_query(user_id)))
         
-        if not reservations:
+        if not csv_data:
             return jsonify({'message': 'No reservations found to export'}), 404
         
-        # Create CSV data
-        csv_data = []
-        for res in reservations:
-            spot = ParkingSpot.query.get(res.spot_id)
-            lot = ParkingLot.query.get(spot.lot_id) if spot else None
-            
-            csv_data.append({
-                'reservation_id': res.id,
-                'lot_name': lot.name if lot else 'Unknown',
-                'spot_id': res.spot_id,
-                'start_time': res.start_time.strftime('%Y-%m-%d %H:%M:%S') if res.start_time else '',
-                'end_time': res.end_time.strftime('%Y-%m-%d %H:%M:%S') if res.end_time else '',
-                'cost': res.cost if res.cost else 0,
-                'status': 'Completed' if res.end_time else 'Active'
-            })
-        
         return jsonify({
             'message': 'CSV export data prepared',
             'data': csv_data,
@@ -205,3 +237,51 @@ def export_csv():
         
     except Exception as e:
         return jsonify({'error': f'Export failed: {str(e)}'}), 500
+
+# Start a background export of the user's history (gzip CSV, or Parquet)
+@user_bp.route('/export-jobs', methods=['POST'])
+def start_export_job():
+    from app.tasks.csv_export import export_reservations_csv
+
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    task = export_reservations_csv.delay(user_id, data.get('format', 'csv'))
+    return jsonify({'message': 'Export started', 'task_id': task.id}), 202
+
+# Poll a background export
+@user_bp.route('/export-jobs/<task_id>', methods=['GET'])
+def export_job_status(task_id):
+    from app.tasks.celery_config import celery
+
+    result = celery.AsyncResult(task_id)
+    data = {'task_id': task_id, 'state': result.state}
+
+    if result.state == 'PROGRESS':
+        data.update(result.info or {})
+    elif result.state == 'SUCCESS':
+        data.update({'rows': result.result['rows'], 'format': result.result['format']})
+    elif result.state == 'FAILURE':
+        data['error'] = str(result.info)
+    return jsonify(data)
+
+# Download a finished background export
+@user_bp.route('/export-jobs/<task_id>/download', methods=['GET'])
+def download_export_job(task_id):
+    from app.tasks.celery_config import celery
+    from app.tasks.csv_export import EXPORT_DIR
+
+    result = celery.AsyncResult(task_id)
+    if result.state != 'SUCCESS':
+        return jsonify({'message': 'Export is not ready', 'state': result.state}), 409
+
+    export = result.result
+    if export['user_id'] != request.args.get('user_id', type=int):
+        return jsonify({'message': 'Export not found'}), 404
+
+    file_path = os.path.abspath(export['file_path'])
+    if not file_path.startswith(os.path.abspath(EXPORT_DIR) + os.sep) or not os.path.exists(file_path):
+        return jsonify({'message': 'Export file is no longer available'}), 410
+    return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
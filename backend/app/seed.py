@@ -0,0 +1,73 @@
+# app/seed.py
+from . import db
+from .models import User, ParkingLot
+from .services.passwords import hash_password
+
+# Default accounts: (username, password, email, role)
+DEFAULT_USERS = (
+    ('anand', 'anand123', 'anand@admin.com', 'admin'),
+    ('user', 'user123', 'user@example.com', 'user'),
+)
+
+SAMPLE_LOTS = (
+    {'name': 'Central Mall Parking', 'address': '123 Main Street, City Center', 'pin_code': '123456',
+     'price_per_hour': 50.0, 'total_spots': 20},
+    {'name': 'Downtown Plaza', 'address': '456 Oak Avenue, Downtown', 'pin_code': '654321',
+     'price_per_hour': 40.0, 'total_spots': 15},
+    {'name': 'Airport Parking', 'address': '789 Airport Road, Terminal 1', 'pin_code': '789012',
+     'price_per_hour': 80.0, 'total_spots': 30},
+)
+
+
+def init_db():
+    """Create any missing tables (use `flask db upgrade` for managed schemas)"""
+    print("[INFO] Creating database tables if not exist...")
+    db.create_all()
+    print("[INFO] Database setup complete.")
+
+
+def seed_defaults(reset_passwords=False):
+    """
+    Create the default accounts and sample lots if they are missing.
+
+    Existing accounts are left alone unless reset_passwords is set, so
+    seeding twice never re-hashes (password hashing is deliberately slow) or
+    rewrites the admin row.
+    """
+    for username, password, email, role in DEFAULT_USERS:
+        user = User.query.filter_by(username=username).first()
+        if user:
+            if reset_passwords:
+                user.password = hash_password(password)
+                user.email = email
+                db.session.commit()
+                print(f"[INFO] Password/Email reset for {user.username}")
+            else:
+                print(f"[INFO] {role.capitalize()} already exists: {user.username}")
+            continue
+        try:
+            db.session.add(User(
+                username=username,
+                password=hash_password(password),
+                email=email,
+                role=role
+            ))
+            db.session.commit()
+            print(f"[INFO] Default {role} created: {username} / {password} (hashed)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Failed to create {role} user: {e}")
+
+    print("[INFO] Creating sample parking lots and spots...")
+    existing_lots = ParkingLot.query.count()
+    if existing_lots:
+        print(f"[INFO] {existing_lots} parking lots already exist")
+        return
+    try:
+        from .services.lot_provisioning import create_lots
+        lots = create_lots(SAMPLE_LOTS)
+        db.session.commit()
+        print(f"[INFO] Created {len(lots)} parking lots with spots")
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Failed to create sample data: {e}")
@@ -0,0 +1,184 @@
+# app/services/allocation.py
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from app.models import db, User, ParkingSpot, Reservation
+from app.services.lot_counters import adjust_lot_counts
+from app.services.lot_metadata import lot_metadata
+
+ReleasedReservation = namedtuple('ReleasedReservation', 'id spot_id lot_id cost')
+
+
+class AllocationError(Exception):
+    """Base class for booking failures that map to a client error"""
+
+
+class NoSpotAvailable(AllocationError):
+    pass
+
+
+class ActiveReservationExists(AllocationError):
+    pass
+
+
+class NoActiveReservation(AllocationError):
+    pass
+
+
+def free_spot_query(lot_id: int):
+    """A free spot in the lot (first by the lot/status index)"""
+    return (
+        select(ParkingSpot.id)
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A')
+        .limit(1)
+    )
+
+
+def open_reservation_query(user_id: int):
+    """The user's open reservation, if any"""
+    return (
+        select(Reservation.id, Reservation.spot_id, Reservation.start_time)
+        .where(Reservation.user_id == user_id, Reservation.end_time.is_(None))
+        .limit(1)
+    )
+
+
+def allocate_spot(lot_id: int, user_id: int, max_attempts: int = 5) -> Reservation:
+    """
+    Atomically claim a free spot in a lot and open a reservation for it.
+
+    On PostgreSQL the user row is locked to serialize that user's bookings
+    and the spot is picked with SELECT ... FOR UPDATE SKIP LOCKED, so
+    concurrent requests never wait on each other's candidate rows.
+    Everywhere else (SQLite) the spot is claimed with a conditional
+    UPDATE ... WHERE status = 'A'; the first write takes the database
+    write lock, which also makes the active-reservation check race-free.
+    A lost race on a candidate is retried with the next free spot.
+
+    The caller owns the transaction: commit on success, roll back on
+    AllocationError so a claimed spot is returned.
+
+    Args:
+        lot_id: Lot to book in
+        user_id: User making the booking
+        max_attempts: Conditional-update retries before giving up
+
+    Returns:
+        The new (flushed, uncommitted) Reservation
+
+    Raises:
+        NoSpotAvailable: The lot has no free spot
+        ActiveReservationExists: The user already holds a spot
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        spot_id = _claim_spot_skip_locked(lot_id, user_id)
+    else:
+        spot_id = _claim_spot_conditional(lot_id, user_id, max_attempts)
+
+    adjust_lot_counts(lot_id, available=-1, occupied=1)
+    reservation = Reservation(
+        spot_id=spot_id,
+        user_id=user_id,
+        start_time=datetime.utcnow()
+    )
+    db.session.add(reservation)
+    db.session.flush()
+    return reservation
+
+
+def release_reservation(user_id: int) -> ReleasedReservation:
+    """
+    Close a user's active reservation, charge it and free its spot.
+
+    The reservation is closed with a conditional UPDATE ... WHERE
+    end_time IS NULL, and the spot and lot counters only change when that
+    UPDATE hit the row. Of two concurrent releases of the same reservation,
+    the loser matches nothing (it waits on the winner's row or write lock)
+    and fails instead of freeing the spot a second time.
+
+    The caller owns the transaction: commit on success, roll back on
+    AllocationError.
+
+    Args:
+        user_id: User releasing their spot
+
+    Returns:
+        The closed reservation's id, spot, lot and cost
+
+    Raises:
+        NoActiveReservation: The user holds no spot, or a concurrent
+            release closed it first
+    """
+    reservation = db.session.execute(open_reservation_query(user_id)).first()
+    if reservation is None:
+        raise NoActiveReservation()
+
+    # The spot's lot and price come from the in-process cache
+    end_time = datetime.utcnow()
+    lot_id = lot_metadata.spot_lot_id(reservation.spot_id)
+    hours = (end_time - reservation.start_time).total_seconds() / 3600
+    cost = round(hours * lot_metadata.lot(lot_id).price_per_hour, 2)
+
+    closed = db.session.execute(
+        update(Reservation)
+        .where(Reservation.id == reservation.id, Reservation.end_time.is_(None))
+        .values(end_time=end_time, cost=cost),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    if closed != 1:
+        raise NoActiveReservation()
+
+    db.session.execute(
+        update(ParkingSpot).where(ParkingSpot.id == reservation.spot_id).values(status='A'),
+        execution_options={'synchronize_session': False}
+    )
+    adjust_lot_counts(lot_id, available=1, occupied=-1)
+    return ReleasedReservation(reservation.id, reservation.spot_id, lot_id, cost)
+
+
+def _has_active_reservation(user_id: int) -> bool:
+    return db.session.execute(open_reservation_query(user_id)).first() is not None
+
+
+def _claim_spot_skip_locked(lot_id: int, user_id: int) -> int:
+    db.session.execute(
+        select(User.id).where(User.id == user_id).with_for_update()
+    )
+    if _has_active_reservation(user_id):
+        raise ActiveReservationExists()
+
+    spot_id = db.session.execute(free_spot_query(lot_id).with_for_update(skip_locked=True)).scalar()
+    if spot_id is None:
+        raise NoSpotAvailable()
+
+    db.session.execute(
+        update(ParkingSpot).where(ParkingSpot.id == spot_id).values(status='O'),
+        execution_options={'synchronize_session': False}
+    )
+    return spot_id
+
+
+def _claim_spot_conditional(lot_id: int, user_id: int, max_attempts: int) -> int:
+    for _ in range(max_attempts):
+        spot_id = db.session.execute(free_spot_query(lot_id)).scalar()
+        if spot_id is None:
+            break
+
+        claimed = db.session.execute(
+            update(ParkingSpot)
+            .where(ParkingSpot.id == spot_id, ParkingSpot.status == 'A')
+            .values(status='O'),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if not claimed:
+            continue
+
+        # The UPDATE above holds the write lock, so no other booking for
+        # this user can commit between this check and our commit.
+        if _has_active_reservation(user_id):
+            raise ActiveReservationExists()
+        return spot_id
+
+    raise NoSpotAvailable()
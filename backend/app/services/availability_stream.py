@@ -0,0 +1,170 @@
+# app/services/availability_stream.py
+import json
+import logging
+import os
+import threading
+import time
+from queue import Empty, Full, Queue
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from app.models import db, ParkingLot
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_CHANNEL = 'lot-availability'
+# Unset means a single process: updates are delivered in-process only
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Comment lines sent to idle streams so proxies keep the connection open
+HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+# Updates buffered per subscriber; a client that falls further behind
+# loses the oldest ones, which is safe because every update is absolute
+SUBSCRIBER_QUEUE_SIZE = 100
+# Open streams per process; each one holds a worker thread or greenlet
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '500'))
+# After a failed publish, skip Redis for this long rather than stall bookings
+REDIS_RETRY_SECONDS = 30
+
+
+class AvailabilityBroadcaster:
+    """
+    Fan availability updates out to every stream open in this process.
+
+    One background thread per process holds a single Redis pub/sub
+    subscription and copies each message into the subscribers' queues,
+    so the cost of an idle subscriber is one queue and one waiting
+    greenlet/thread. Without REDIS_URL, or while Redis is unreachable,
+    updates are delivered in-process only, which is enough for a single
+    development server.
+    """
+
+    def __init__(self, redis_url: Optional[str] = REDIS_URL, max_subscribers: int = SSE_MAX_SUBSCRIBERS):
+        self.redis_url = redis_url
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._client = None
+        self._redis_down_until = 0.0
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        return self._client
+
+    def subscribe(self) -> Optional[Queue]:
+        """A queue of updates for one stream, or None when this process is at max_subscribers"""
+        queue = Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(queue)
+            if self._listener is None and self.redis_url:
+                self._listener = threading.Thread(target=self._listen, name='availability-listener', daemon=True)
+                self._listener.start()
+        return queue
+
+    def unsubscribe(self, queue: Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish(self, message: str) -> None:
+        """Send one update to every process; falls back to this process only"""
+        if self.redis_url and time.monotonic() >= self._redis_down_until:
+            try:
+                self._redis().publish(AVAILABILITY_CHANNEL, message)
+                return
+            except Exception as e:
+                logger.warning(f"Availability publish via Redis failed ({e}), delivering locally")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        self.deliver(message)
+
+    def deliver(self, message: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(message)
+            except Full:
+                try:
+                    queue.get_nowait()
+                    queue.put_nowait(message)
+                except (Empty, Full):
+                    pass
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                import redis
+                pubsub = redis.Redis.from_url(self.redis_url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(AVAILABILITY_CHANNEL)
+                for item in pubsub.listen():
+                    self.deliver(item['data'].decode())
+            except Exception as e:
+                logger.warning(f"Availability subscription lost ({e}), retrying in {REDIS_RETRY_SECONDS}s")
+                time.sleep(REDIS_RETRY_SECONDS)
+
+
+broadcaster = AvailabilityBroadcaster()
+
+
+def _lot_update(row) -> dict:
+    return {
+        'lot_id': row.id,
+        'total_spots': row.total_spots,
+        'available': row.available_count,
+        'occupied': row.occupied_count
+    }
+
+
+def publish_lot_availability(*lot_ids: int) -> None:
+    """
+    Push the current counters of the given lots to every open stream.
+
+    Call after commit. Updates carry absolute counts rather than +1/-1,
+    so a dropped or reordered message is corrected by the next one.
+    """
+    try:
+        rows = db.session.execute(
+            select(ParkingLot.id, ParkingLot.total_spots, ParkingLot.available_count, ParkingLot.occupied_count)
+            .where(ParkingLot.id.in_(lot_ids))
+        ).all()
+        found = {row.id for row in rows}
+        updates = [_lot_update(row) for row in rows]
+        updates += [{'lot_id': lot_id, 'deleted': True} for lot_id in lot_ids if lot_id not in found]
+        for update in updates:
+            broadcaster.publish(json.dumps(update))
+    except Exception as e:
+        logger.error(f"Could not publish availability for lots {lot_ids}: {e}")
+
+
+def availability_snapshot(session=None) -> List[dict]:
+    """Current counters of every lot, sent when a stream opens"""
+    session = session or db.session
+    rows = session.execute(
+        select(ParkingLot.id, ParkingLot.total_spots, ParkingLot.available_count, ParkingLot.occupied_count)
+        .order_by(ParkingLot.id)
+    ).all()
+    return [_lot_update(row) for row in rows]
+
+
+def event_stream(queue: Queue, snapshot: List[dict]) -> Iterator[str]:
+    """
+    Server-Sent Events for one subscriber: a snapshot, then updates.
+
+    Holds no database connection or app context while waiting.
+    """
+    try:
+        yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+        while True:
+            try:
+                message = queue.get(timeout=HEARTBEAT_SECONDS)
+            except Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: availability\ndata: {message}\n\n"
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,123 @@
+# app/services/lot_cache.py
+import hashlib
+import logging
+import os
+from functools import wraps
+from typing import Iterable
+
+from flask import g, make_response, request
+from sqlalchemy import select
+
+from app import cache
+from app.models import db, ParkingLot
+from app.services.read_session import REPLICA_MAX_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Safety net only: writes bump versions, so entries normally go stale by key
+LOT_CACHE_TIMEOUT = int(os.environ.get('LOT_CACHE_TIMEOUT', '300'))
+
+LOT_SET_VERSION_KEY = 'lots:v'
+
+
+def init_cache(app) -> None:
+    """
+    Bind the cache to the app: Redis when CACHE_REDIS_URL or REDIS_URL is
+    set, else a SimpleCache.
+
+    Nothing is contacted at startup; if Redis is down later, cache errors
+    are logged and views run uncached. SimpleCache is per process, so it
+    only suits tests and single-process development servers, where
+    invalidations need not reach other workers.
+    """
+    if app.config.get('CACHE_TYPE') is None:
+        redis_url = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL')
+        if redis_url:
+            app.config.update(CACHE_TYPE='RedisCache', CACHE_REDIS_URL=redis_url, CACHE_KEY_PREFIX='parking:')
+        else:
+            app.config['CACHE_TYPE'] = 'SimpleCache'
+    app.config.setdefault('CACHE_DEFAULT_TIMEOUT', LOT_CACHE_TIMEOUT)
+    cache.init_app(app)
+
+
+def _lot_version_key(lot_id: int) -> str:
+    return f'lot:{lot_id}:v'
+
+
+def _bump(key: str) -> None:
+    try:
+        # inc() is atomic on Redis, so concurrent writers never lose a bump
+        if cache.cache.inc(key) is None:
+            cache.set(key, 1, timeout=0)
+    except Exception as e:
+        logger.error(f"Could not bump cache version {key}: {e}")
+
+
+def invalidate_lots(*lot_ids: int, lot_set_changed: bool = False) -> None:
+    """
+    Expire every cached listing that includes the given lots.
+
+    Call after the write has committed. Pass lot_set_changed=True when
+    lots were created or deleted, which also changes the listing's shape.
+    """
+    for lot_id in lot_ids:
+        _bump(_lot_version_key(lot_id))
+    if lot_set_changed:
+        _bump(LOT_SET_VERSION_KEY)
+
+
+def _lot_ids(set_version) -> Iterable[int]:
+    key = f'lots:ids:{set_version}'
+    lot_ids = cache.get(key)
+    if lot_ids is None:
+        lot_ids = db.session.execute(select(ParkingLot.id).order_by(ParkingLot.id)).scalars().all()
+        cache.set(key, lot_ids)
+    return lot_ids
+
+
+def _listing_key() -> str:
+    """
+    Cache key covering the lot set version and every lot's version.
+
+    Versions are read before the view queries the database, so a write
+    that lands in between can only leave fresh data under an old key,
+    never stale data under a new one.
+    """
+    set_version = cache.get(LOT_SET_VERSION_KEY) or 0
+    lot_ids = _lot_ids(set_version)
+    versions = cache.get_many(*[_lot_version_key(lot_id) for lot_id in lot_ids]) if lot_ids else []
+    digest = hashlib.sha1(repr((lot_ids, [v or 0 for v in versions])).encode()).hexdigest()
+    return f'view:{request.full_path}:{set_version}:{digest}'
+
+
+def cached_lot_listing(view):
+    """
+    Serve a lot listing view from the cache, keyed by lot versions.
+
+    Only 200 responses are stored. A view that read from a lagging
+    replica may return data older than the versions it is keyed by, so
+    such entries only live for REPLICA_MAX_LAG_SECONDS. Cache errors are
+    logged and the view runs uncached, so a Redis outage never takes the
+    endpoint down.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            key = _listing_key()
+            hit = cache.get(key)
+        except Exception as e:
+            logger.error(f"Lot cache read failed: {e}")
+            key, hit = None, None
+        if hit is not None:
+            body, status, headers = hit
+            return make_response(body, status, headers)
+
+        response = make_response(view(*args, **kwargs))
+        if key and response.status_code == 200:
+            try:
+                timeout = REPLICA_MAX_LAG_SECONDS if g.get('read_from_replica') else None
+                cache.set(key, (response.get_data(), response.status_code, list(response.headers.items())), timeout=timeout)
+            except Exception as e:
+                logger.error(f"Lot cache write failed: {e}")
+        return response
+    return wrapper
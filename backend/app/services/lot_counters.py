@@ -0,0 +1,61 @@
+# app/services/lot_counters.py
+from sqlalchemy import case, func, select
+
+from app.models import db, ParkingLot, ParkingSpot
+
+
+def adjust_lot_counts(lot_id: int, available: int = 0, occupied: int = 0) -> None:
+    """
+    Shift a lot's availability counters inside the caller's transaction.
+
+    The arithmetic happens in SQL so concurrent bookings on the same lot
+    never overwrite each other's updates.
+
+    Args:
+        lot_id: Parking lot whose counters change
+        available: Delta applied to available_count
+        occupied: Delta applied to occupied_count
+    """
+    db.session.execute(
+        ParkingLot.__table__.update()
+        .where(ParkingLot.id == lot_id)
+        .values(
+            available_count=ParkingLot.available_count + available,
+            occupied_count=ParkingLot.occupied_count + occupied
+        )
+    )
+
+
+def reconcile_lot_counts() -> int:
+    """
+    Recompute every lot's counters from the parking_spot table.
+
+    Runs as a single UPDATE with correlated aggregates, so it is safe to
+    schedule while the app is serving traffic.
+
+    Returns:
+        Number of lots updated
+    """
+    def spot_count(status):
+        return (
+            select(func.coalesce(func.sum(case((ParkingSpot.status == status, 1), else_=0)), 0))
+            .where(ParkingSpot.lot_id == ParkingLot.id)
+            .scalar_subquery()
+        )
+
+    result = db.session.execute(
+        ParkingLot.__table__.update().values(
+            available_count=spot_count('A'),
+            occupied_count=spot_count('O')
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def count_available_lots(session=None) -> int:
+    """Number of lots with at least one free spot, read from the counters"""
+    session = session or db.session
+    return session.execute(
+        select(func.count(ParkingLot.id)).where(ParkingLot.available_count > 0)
+    ).scalar()
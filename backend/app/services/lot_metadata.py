@@ -0,0 +1,205 @@
+# app/services/lot_metadata.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.models import db, ParkingLot, ParkingSpot
+
+logger = logging.getLogger(__name__)
+
+LOT_METADATA_CHANNEL = 'lot-metadata'
+
+LOT_METADATA_TTL_SECONDS = int(os.environ.get('LOT_METADATA_TTL_SECONDS', '300'))
+LOT_METADATA_MAX_LOTS = int(os.environ.get('LOT_METADATA_MAX_LOTS', '1024'))
+LOT_METADATA_MAX_SPOTS = int(os.environ.get('LOT_METADATA_MAX_SPOTS', '100000'))
+# Seconds between attempts to re-subscribe after losing Redis
+RESUBSCRIBE_SECONDS = 30
+
+LotMeta = namedtuple('LotMeta', 'id name address pin_code price_per_hour')
+
+
+class _ExpiringLRU:
+    """Size- and age-bounded mapping; the owning cache holds the lock"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, now: float) -> None:
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key) -> None:
+        self._entries.pop(key, None)
+
+    def discard_values(self, values) -> None:
+        for key in [key for key, (value, _) in self._entries.items() if value in values]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class LotMetadataCache:
+    """
+    Per-process cache of lot details and spot -> lot mappings.
+
+    Lots are read far more often than they are edited, so lookups are
+    served from memory and only a miss queries the database. Entries
+    expire after LOT_METADATA_TTL_SECONDS and the least recently used are
+    evicted past the size limits. Admin lot writes call invalidate(),
+    which drops the entries here and, when REDIS_URL is set, in every
+    other process through Redis pub/sub; the TTL bounds staleness if a
+    message is lost.
+    """
+
+    def __init__(self, redis_url: Optional[str] = os.environ.get('REDIS_URL')):
+        self.redis_url = redis_url
+        self._lots = _ExpiringLRU(LOT_METADATA_MAX_LOTS, LOT_METADATA_TTL_SECONDS)
+        self._spots = _ExpiringLRU(LOT_METADATA_MAX_SPOTS, LOT_METADATA_TTL_SECONDS)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a row read before one is not cached after it
+        self._version = 0
+        self._listener = None
+        self._client = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lot(self, lot_id: int) -> Optional[LotMeta]:
+        """Name, address, pin code and price of a lot, or None if it does not exist"""
+        meta, version = self._lookup(self._lots, lot_id)
+        if meta is not None:
+            return meta
+        row = db.session.execute(
+            select(ParkingLot.id, ParkingLot.name, ParkingLot.address, ParkingLot.pin_code, ParkingLot.price_per_hour)
+            .where(ParkingLot.id == lot_id)
+        ).first()
+        if row is None:
+            return None
+        meta = LotMeta(*row)
+        self._store(self._lots, lot_id, meta, version)
+        return meta
+
+    def spot_lot_id(self, spot_id: int) -> Optional[int]:
+        """Id of the lot a spot belongs to, or None if the spot does not exist"""
+        lot_id, version = self._lookup(self._spots, spot_id)
+        if lot_id is not None:
+            return lot_id
+        lot_id = db.session.execute(select(ParkingSpot.lot_id).where(ParkingSpot.id == spot_id)).scalar()
+        if lot_id is not None:
+            self._store(self._spots, spot_id, lot_id, version)
+        return lot_id
+
+    def _lookup(self, table: _ExpiringLRU, key):
+        self._ensure_listener()
+        with self._lock:
+            value = table.get(key, time.monotonic())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value, self._version
+
+    def _store(self, table: _ExpiringLRU, key, value, version: int) -> None:
+        with self._lock:
+            if version == self._version:
+                table.put(key, value, time.monotonic())
+
+    def invalidate(self, *lot_ids: int) -> None:
+        """
+        Forget the given lots and their spots in every process.
+
+        Call after commit whenever a lot's details change or spots are
+        added or removed (spot ids can be reused by later inserts).
+        """
+        self._apply(lot_ids)
+        if not self.redis_url:
+            return
+        try:
+            self._redis().publish(LOT_METADATA_CHANNEL, json.dumps(list(lot_ids)))
+        except Exception as e:
+            logger.warning(f"Lot metadata invalidation via Redis failed ({e}); other processes rely on the TTL")
+
+    def _apply(self, lot_ids) -> None:
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+            for lot_id in lot_ids:
+                self._lots.discard(lot_id)
+            self._spots.discard_values(set(lot_ids))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._lots.clear()
+            self._spots.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations,
+                'evictions': self._lots.evictions + self._spots.evictions,
+                'lots': len(self._lots),
+                'spots': len(self._spots),
+            }
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        return self._client
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None or not self.redis_url:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='lot-metadata-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                import redis
+                pubsub = redis.Redis.from_url(self.redis_url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(LOT_METADATA_CHANNEL)
+                for item in pubsub.listen():
+                    self._apply(json.loads(item['data']))
+            except Exception as e:
+                logger.warning(f"Lot metadata subscription lost ({e}), retrying in {RESUBSCRIBE_SECONDS}s")
+            # Invalidations may have been missed while disconnected
+            self.clear()
+            time.sleep(RESUBSCRIBE_SECONDS)
+
+
+lot_metadata = LotMetadataCache()
@@ -0,0 +1,126 @@
+# app/services/lot_provisioning.py
+import csv
+import io
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, exists, insert, select
+
+from app.models import db, ParkingLot, ParkingSpot, Reservation
+from app.services.lot_counters import adjust_lot_counts
+
+# Rows sent per executemany batch
+SPOT_INSERT_CHUNK = 1000
+
+LOT_FIELDS = ('name', 'address', 'pin_code', 'price_per_hour', 'total_spots')
+
+
+class LotResizeError(Exception):
+    """The requested size would remove occupied spots or spots with reservation history"""
+
+
+def insert_spots(lot_id: int, count: int, chunk_size: int = SPOT_INSERT_CHUNK) -> None:
+    """
+    Add `count` available spots to a lot with chunked executemany inserts.
+
+    Bypasses the ORM unit of work, so no ParkingSpot objects are built
+    and memory stays flat however large the lot. Runs in the caller's
+    transaction.
+    """
+    statement = insert(ParkingSpot)
+    for start in range(0, count, chunk_size):
+        rows = min(chunk_size, count - start)
+        db.session.execute(statement, [{'lot_id': lot_id, 'status': 'A'}] * rows)
+
+
+def create_lot(data: Dict) -> ParkingLot:
+    """Create one lot and its spots in the caller's transaction"""
+    lot = ParkingLot(
+        name=data['name'],
+        address=data['address'],
+        pin_code=data['pin_code'],
+        price_per_hour=data['price_per_hour'],
+        total_spots=data['total_spots'],
+        available_count=data['total_spots'],
+        occupied_count=0
+    )
+    db.session.add(lot)
+    db.session.flush()
+    insert_spots(lot.id, lot.total_spots)
+    return lot
+
+
+def create_lots(lots_data: Iterable[Dict]) -> List[ParkingLot]:
+    """Create many lots in the caller's transaction"""
+    return [create_lot(data) for data in lots_data]
+
+
+def resize_lot(lot: ParkingLot, total_spots: int) -> None:
+    """
+    Grow or shrink a lot to `total_spots` with set-based statements.
+
+    Growing bulk-inserts the missing spots. Shrinking deletes free spots
+    that no reservation references, newest first, in one
+    DELETE ... WHERE id IN (SELECT ...). Occupied spots and spots with
+    reservation history are never removed: the foreign key would reject
+    the delete, and on SQLite a reused id would hand the old reservations
+    to a new spot.
+
+    Raises:
+        LotResizeError: Fewer removable spots than the lot would need to lose
+    """
+    delta = total_spots - lot.total_spots
+    if delta > 0:
+        insert_spots(lot.id, delta)
+    elif delta < 0:
+        referenced = exists().where(Reservation.spot_id == ParkingSpot.id)
+        free_spots = (
+            select(ParkingSpot.id)
+            .where(ParkingSpot.lot_id == lot.id, ParkingSpot.status == 'A', ~referenced)
+            .order_by(ParkingSpot.id.desc())
+            .limit(-delta)
+        )
+        removed = db.session.execute(
+            # Both checks are repeated so a spot booked meanwhile is left alone
+            delete(ParkingSpot)
+            .where(ParkingSpot.id.in_(free_spots.scalar_subquery()), ParkingSpot.status == 'A', ~referenced),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if removed < -delta:
+            raise LotResizeError(
+                f'Only {removed} free spots without reservation history can be removed, {-delta} requested'
+            )
+
+    lot.total_spots = total_spots
+    adjust_lot_counts(lot.id, available=delta)
+
+
+def parse_lots(payload, content_type: str) -> List[Dict]:
+    """
+    Read a bulk import body: a JSON list of lots, or CSV with a header row
+    naming LOT_FIELDS.
+
+    Raises:
+        ValueError: A lot is missing a field or has an invalid value
+    """
+    if content_type == 'text/csv':
+        rows = list(csv.DictReader(io.StringIO(payload)))
+    else:
+        rows = payload
+    if not isinstance(rows, list) or not rows:
+        raise ValueError('Expected a non-empty list of lots')
+
+    lots = []
+    for index, row in enumerate(rows, start=1):
+        missing = [field for field in LOT_FIELDS if not isinstance(row, dict) or row.get(field) in (None, '')]
+        if missing:
+            raise ValueError(f"Lot {index} is missing {', '.join(missing)}")
+        try:
+            lot = {field: row[field] for field in LOT_FIELDS}
+            lot['price_per_hour'] = float(lot['price_per_hour'])
+            lot['total_spots'] = int(lot['total_spots'])
+        except (TypeError, ValueError):
+            raise ValueError(f'Lot {index} has an invalid price_per_hour or total_spots')
+        if lot['total_spots'] < 1 or lot['price_per_hour'] < 0:
+            raise ValueError(f'Lot {index} needs at least one spot and a non-negative price')
+        lots.append(lot)
+    return lots
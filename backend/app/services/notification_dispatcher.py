@@ -0,0 +1,177 @@
+# app/services/notification_dispatcher.py
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Fonnte quota and client tuning; override per deployment
+WHATSAPP_RATE_PER_SECOND = float(os.environ.get('WHATSAPP_RATE_PER_SECOND', '5'))
+WHATSAPP_BURST = int(os.environ.get('WHATSAPP_BURST', '10'))
+WHATSAPP_MAX_WORKERS = int(os.environ.get('WHATSAPP_MAX_WORKERS', '8'))
+
+RATE_LIMIT_KEY = 'ratelimit:whatsapp'
+
+# Refill and take one token atomically; returns the seconds to wait (0 when
+# a token was taken). Uses the Redis clock so every worker agrees on time.
+_TAKE_TOKEN = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    acquire() blocks until a token is available, so callers sharing one
+    bucket never exceed `rate` requests per second on average, with
+    bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Token bucket kept in a Redis hash, shared by every process using `key`.
+
+    Celery's prefork pool sends from several child processes; a bucket per
+    process would let each of them spend the whole provider quota. If
+    Redis cannot be reached, acquire() falls back to this process's own
+    bucket rather than stopping the sends.
+    """
+
+    def __init__(self, redis_url: str, rate: float, capacity: int, key: str = RATE_LIMIT_KEY):
+        super().__init__(rate, capacity)
+        self.redis_url = redis_url
+        self.key = key
+        self._script = None
+
+    def _take(self) -> float:
+        if self._script is None:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+            self._script = client.register_script(_TAKE_TOKEN)
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity]))
+
+    def acquire(self) -> None:
+        while True:
+            try:
+                wait = self._take()
+            except Exception as e:
+                logger.warning(f"Shared WhatsApp rate limit unavailable ({e}), limiting this process only")
+                super().acquire()
+                return
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+_session = None
+_rate_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_http_session() -> requests.Session:
+    """Process-wide keep-alive session sized for the dispatcher pool"""
+    global _session
+    with _shared_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=WHATSAPP_MAX_WORKERS * 2)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def shared_rate_limiter() -> TokenBucket:
+    """
+    The limiter every sender draws the provider quota from.
+
+    With REDIS_URL set it is shared by all worker processes. Without it
+    the bucket is per process, so run the Celery worker with
+    --concurrency 1 to stay within the quota.
+    """
+    global _rate_limiter
+    with _shared_lock:
+        if _rate_limiter is None:
+            redis_url = os.environ.get('REDIS_URL')
+            if redis_url:
+                _rate_limiter = RedisTokenBucket(redis_url, WHATSAPP_RATE_PER_SECOND, WHATSAPP_BURST)
+            else:
+                _rate_limiter = TokenBucket(WHATSAPP_RATE_PER_SECOND, WHATSAPP_BURST)
+        return _rate_limiter
+
+
+class WhatsAppDispatcher:
+    """
+    Fan notification sends out over a bounded thread pool.
+
+    All workers share one WhatsAppService, hence one pooled HTTP session
+    and one rate limiter.
+    """
+
+    def __init__(self, service=None, max_workers: Optional[int] = None):
+        if service is None:
+            from app.services.whatsapp_service import WhatsAppService
+            service = WhatsAppService()
+        self.service = service
+        self.max_workers = max_workers or WHATSAPP_MAX_WORKERS
+
+    def map(self, send: Callable, items: Iterable) -> List:
+        """
+        Call send(item) for every item concurrently.
+
+        Returns:
+            Results in input order; an exception from send is logged and
+            returned in place of its result so one failure never stops
+            the batch.
+        """
+        def run(item):
+            try:
+                return send(item)
+            except Exception as e:
+                logger.error(f"Notification dispatch failed: {e}")
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(run, items))
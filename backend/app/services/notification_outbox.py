@@ -0,0 +1,188 @@
+# app/services/notification_outbox.py
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import db, NotificationOutbox, ParkingLot, ParkingSpot, Reservation, User
+
+logger = logging.getLogger(__name__)
+
+BOOKING_CONFIRMATION = 'booking_confirmation'
+SPOT_RELEASED = 'spot_released'
+
+# Rows claimed per drain pass and how long a claim lasts before another
+# worker may take the row over (e.g. after a worker restart)
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '100'))
+OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS', '60'))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+
+
+def enqueue_notification(kind: str, reservation_id: int) -> None:
+    """
+    Record a notification intent inside the caller's transaction.
+
+    Nothing is sent here: the row commits (or rolls back) together with
+    the reservation change, and drain_outbox delivers it later. A repeated
+    enqueue for the same event is a no-op: the insert skips an existing
+    idempotency key (ON CONFLICT DO NOTHING) instead of raising and
+    aborting the caller's transaction.
+
+    Args:
+        kind: BOOKING_CONFIRMATION or SPOT_RELEASED
+        reservation_id: Reservation the notification describes
+    """
+    values = {'idempotency_key': f"{kind}:{reservation_id}", 'kind': kind, 'reservation_id': reservation_id}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+        db.session.execute(
+            dialect_insert(NotificationOutbox).values(**values)
+            .on_conflict_do_nothing(index_elements=['idempotency_key'])
+        )
+        return
+    # Elsewhere check first; the unique key still backs this up under a race
+    exists = db.session.execute(
+        select(NotificationOutbox.id).where(NotificationOutbox.idempotency_key == values['idempotency_key'])
+    ).first()
+    if exists is None:
+        db.session.execute(insert(NotificationOutbox).values(**values))
+
+
+def _claimable(now):
+    return (
+        (NotificationOutbox.status == 'P')
+        & or_(NotificationOutbox.locked_until.is_(None), NotificationOutbox.locked_until < now)
+    )
+
+
+def _claim_batch(batch_size: int) -> List[int]:
+    """Lease up to batch_size pending rows to this worker and commit the lease"""
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        select(NotificationOutbox.id)
+        .where(_claimable(now))
+        .order_by(NotificationOutbox.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+    claimed = []
+    lease = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    for outbox_id in candidates:
+        # Conditional update: a concurrent worker that got here first wins
+        if db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == outbox_id, _claimable(now))
+            .values(locked_until=lease),
+            execution_options={'synchronize_session': False}
+        ).rowcount:
+            claimed.append(outbox_id)
+    db.session.commit()
+    return claimed
+
+
+def _load_details(outbox_ids: List[int]):
+    """Outbox rows with the reservation, user and lot they describe, in one query"""
+    return db.session.execute(
+        select(
+            NotificationOutbox.id, NotificationOutbox.kind, NotificationOutbox.attempts,
+            Reservation.spot_id, Reservation.start_time, Reservation.end_time, Reservation.cost,
+            User.username, User.phone_number, ParkingLot.name.label('lot_name')
+        )
+        .join(Reservation, Reservation.id == NotificationOutbox.reservation_id)
+        .join(User, User.id == Reservation.user_id)
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(NotificationOutbox.id.in_(outbox_ids))
+        .order_by(NotificationOutbox.id)
+    ).all()
+
+
+def _deliver(row, whatsapp) -> Dict:
+    from app.services.whatsapp_service import is_valid_number
+
+    if not is_valid_number(row.phone_number):
+        return {'success': True, 'skipped': True}
+
+    if row.kind == BOOKING_CONFIRMATION:
+        return whatsapp.send_booking_confirmation(
+            phone_number=row.phone_number,
+            username=row.username,
+            lot_name=row.lot_name or 'N/A',
+            spot_id=row.spot_id,
+            start_time=row.start_time.strftime('%Y-%m-%d %H:%M:%S')
+        )
+    if row.kind == SPOT_RELEASED:
+        return whatsapp.send_spot_released(
+            phone_number=row.phone_number,
+            username=row.username,
+            lot_name=row.lot_name or 'N/A',
+            spot_id=row.spot_id,
+            cost=row.cost or 0,
+            duration=(row.end_time - row.start_time).total_seconds() / 3600
+        )
+    return {'success': False, 'error': f"Unknown notification kind: {row.kind}"}
+
+
+def drain_outbox(batch_size: int = OUTBOX_BATCH_SIZE, dispatcher=None) -> Dict:
+    """
+    Deliver one batch of pending notifications.
+
+    Rows are leased before sending and marked sent afterwards, so delivery
+    is at-least-once: a worker that dies mid-batch leaves its rows to be
+    picked up again once the lease expires, and a row already marked sent
+    is never sent twice. Failed sends back off exponentially and are given
+    up on (status 'F') after OUTBOX_MAX_ATTEMPTS.
+
+    Returns:
+        Counts of rows claimed, sent, skipped (no phone) and failed
+    """
+    outbox_ids = _claim_batch(batch_size)
+    stats = {'claimed': len(outbox_ids), 'sent': 0, 'skipped': 0, 'failed': 0}
+    if not outbox_ids:
+        return stats
+
+    if dispatcher is None:
+        from app.services.notification_dispatcher import WhatsAppDispatcher
+        dispatcher = WhatsAppDispatcher()
+
+    rows = _load_details(outbox_ids)
+    results = dispatcher.map(lambda row: _deliver(row, dispatcher.service), rows)
+
+    now = datetime.utcnow()
+    orphaned = set(outbox_ids) - {row.id for row in rows}
+    if orphaned:
+        # The reservation is gone; there is nothing left to describe
+        db.session.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(orphaned))
+            .values(status='F', locked_until=None, last_error='Reservation not found'),
+            execution_options={'synchronize_session': False}
+        )
+        stats['failed'] += len(orphaned)
+
+    for row, result in zip(rows, results):
+        if isinstance(result, dict) and result.get('success'):
+            stats['skipped' if result.get('skipped') else 'sent'] += 1
+            values = {'status': 'S', 'sent_at': now, 'locked_until': None}
+        else:
+            stats['failed'] += 1
+            error = result.get('error', 'Unknown error') if isinstance(result, dict) else str(result)
+            attempts = row.attempts + 1
+            values = {
+                'status': 'F' if attempts >= OUTBOX_MAX_ATTEMPTS else 'P',
+                'attempts': attempts,
+                'locked_until': now + timedelta(seconds=2 ** attempts),
+                'last_error': error[:200]
+            }
+            logger.warning(f"Notification {row.id} ({row.kind}) failed, attempt {attempts}: {error}")
+        db.session.execute(
+            update(NotificationOutbox).where(NotificationOutbox.id == row.id).values(**values),
+            execution_options={'synchronize_session': False}
+        )
+    db.session.commit()
+    return stats
@@ -0,0 +1,46 @@
+# app/services/passwords.py
+import os
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Werkzeug method string: "scrypt[:n:r:p]" or "pbkdf2[:hash[:iterations]]"
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def _expand(method: str) -> str:
+    """The method string Werkzeug stores for `method`, defaults filled in"""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return f'scrypt:{2 ** 15}:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        hash_name = args[0] if args else 'sha256'
+        return f'pbkdf2:{hash_name}:{DEFAULT_PBKDF2_ITERATIONS}'
+    return method
+
+
+CURRENT_METHOD = _expand(PASSWORD_HASH_METHOD)
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured PASSWORD_HASH_METHOD"""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash was made with other parameters than the current ones"""
+    return password_hash.split('$', 1)[0] != CURRENT_METHOD
+
+
+def verify_password(user, password: str) -> bool:
+    """
+    Check a password against the user's stored hash.
+
+    On success, a hash made with outdated parameters is replaced with one
+    using PASSWORD_HASH_METHOD, so changing the setting migrates accounts
+    as their owners log in. The caller commits.
+    """
+    if not check_password_hash(user.password, password):
+        return False
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+    return True
@@ -0,0 +1,199 @@
+# app/services/period_summary.py
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select
+
+from app.models import db, Reservation, User, UserPeriodSummary
+
+# Rolled up from the daily rows after every refresh
+ROLLUP_PERIODS = ('week', 'month')
+
+# Dirty days recomputed per INSERT ... SELECT
+DAYS_PER_STATEMENT = 50
+
+# How far before the previous run's watermark an incremental run looks again.
+# end_time is set before the release commits, so a release committed after a
+# refresh read the table can carry an end_time older than that refresh.
+SUMMARY_REFRESH_LAG_SECONDS = int(os.environ.get('SUMMARY_REFRESH_LAG_SECONDS', '300'))
+
+SUMMARY_COLUMNS = ['user_id', 'period', 'period_start', 'reservations', 'total_hours', 'total_cost', 'computed_at']
+
+
+def period_start(day: date, period: str) -> date:
+    """First day of the day/week (Monday)/month containing `day`"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period_start(start: date, period: str) -> date:
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def reservation_hours():
+    """Duration of a finished reservation in hours, computed by the database"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        hours = (func.julianday(Reservation.end_time) - func.julianday(Reservation.start_time)) * 24
+    else:
+        hours = func.extract('epoch', Reservation.end_time - Reservation.start_time) / 3600
+    return case((Reservation.end_time.is_not(None), hours), else_=0)
+
+
+def _start_day():
+    return func.date(Reservation.start_time, type_=db.Date)
+
+
+def _daily_select(computed_at: datetime):
+    """Per-user, per-start-day totals ready for INSERT ... SELECT"""
+    return (
+        select(
+            Reservation.user_id,
+            literal('day'),
+            _start_day(),
+            func.count(Reservation.id),
+            func.coalesce(func.sum(reservation_hours()), 0),
+            func.coalesce(func.sum(Reservation.cost), 0),
+            literal(computed_at, db.DateTime)
+        )
+        .group_by(Reservation.user_id, _start_day())
+    )
+
+
+def dirty_days_query(since: datetime):
+    """
+    Start days whose totals may have changed since the last run.
+
+    A reservation changes when it is created (end_time NULL) or released
+    (end_time set), so every row touched after `since` is either still
+    open or ended after it; both are read from the end_time index.
+    """
+    return (
+        select(_start_day())
+        .where(or_(Reservation.end_time.is_(None), Reservation.end_time >= since))
+        .distinct()
+    )
+
+
+def _dirty_days(since: datetime) -> List[date]:
+    return sorted(db.session.execute(dirty_days_query(since)).scalars().all())
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _refresh_days(days: List[date], computed_at: datetime) -> None:
+    for chunk in _chunks(days, DAYS_PER_STATEMENT):
+        db.session.execute(
+            delete(UserPeriodSummary)
+            .where(UserPeriodSummary.period == 'day', UserPeriodSummary.period_start.in_(chunk))
+        )
+        # Compare start_time against day bounds instead of calling date() per row
+        ranges = or_(*(
+            and_(
+                Reservation.start_time >= datetime.combine(day, datetime.min.time()),
+                Reservation.start_time < datetime.combine(day + timedelta(days=1), datetime.min.time())
+            )
+            for day in chunk
+        ))
+        db.session.execute(
+            insert(UserPeriodSummary).from_select(SUMMARY_COLUMNS, _daily_select(computed_at).where(ranges))
+        )
+
+
+def _roll_up(period: str, start: date, computed_at: datetime) -> None:
+    """Rebuild one week/month from the daily rows it covers"""
+    db.session.execute(
+        delete(UserPeriodSummary)
+        .where(UserPeriodSummary.period == period, UserPeriodSummary.period_start == start)
+    )
+    db.session.execute(
+        insert(UserPeriodSummary).from_select(
+            SUMMARY_COLUMNS,
+            select(
+                UserPeriodSummary.user_id,
+                literal(period),
+                literal(start, db.Date),
+                func.sum(UserPeriodSummary.reservations),
+                func.sum(UserPeriodSummary.total_hours),
+                func.sum(UserPeriodSummary.total_cost),
+                literal(computed_at, db.DateTime)
+            )
+            .where(
+                UserPeriodSummary.period == 'day',
+                UserPeriodSummary.period_start >= start,
+                UserPeriodSummary.period_start < next_period_start(start, period)
+            )
+            .group_by(UserPeriodSummary.user_id)
+        )
+    )
+
+
+def refresh_period_summaries(full: bool = False) -> Dict:
+    """
+    Bring user_period_summary up to date with the reservation table.
+
+    Daily rows are the source of truth and are computed in SQL with one
+    grouped INSERT ... SELECT. An incremental run only recomputes the
+    start days that changed since the previous run, then re-rolls the
+    weeks and months containing them from the daily rows, so its cost
+    follows the amount of new activity rather than the size of history.
+    The first run (or full=True) rebuilds everything.
+
+    Returns:
+        Counts of days and rolled-up periods recomputed
+    """
+    computed_at = datetime.utcnow()
+    since = None if full else db.session.execute(
+        select(func.max(UserPeriodSummary.computed_at)).where(UserPeriodSummary.period == 'day')
+    ).scalar()
+
+    if since is None:
+        db.session.execute(delete(UserPeriodSummary))
+        db.session.execute(insert(UserPeriodSummary).from_select(SUMMARY_COLUMNS, _daily_select(computed_at)))
+        days = db.session.execute(
+            select(UserPeriodSummary.period_start).where(UserPeriodSummary.period == 'day').distinct()
+        ).scalars().all()
+    else:
+        days = _dirty_days(since - timedelta(seconds=SUMMARY_REFRESH_LAG_SECONDS))
+        _refresh_days(days, computed_at)
+
+    periods = sorted({(period, period_start(day, period)) for day in days for period in ROLLUP_PERIODS})
+    for period, start in periods:
+        _roll_up(period, start, computed_at)
+
+    db.session.commit()
+    return {'days': len(days), 'periods': len(periods)}
+
+
+def period_totals(period: str, start: date, session=None):
+    """
+    Users with activity in one period, with their totals and contact details.
+
+    Reads only the summary table, so dashboards and report jobs can call it
+    as often as they like.
+    """
+    session = session or db.session
+    return session.execute(
+        select(
+            User.id, User.username, User.email, User.phone_number,
+            UserPeriodSummary.reservations, UserPeriodSummary.total_hours, UserPeriodSummary.total_cost
+        )
+        .join(User, User.id == UserPeriodSummary.user_id)
+        .where(
+            UserPeriodSummary.period == period,
+            UserPeriodSummary.period_start == start,
+            UserPeriodSummary.reservations > 0,
+            User.role == 'user'
+        )
+        .order_by(User.id)
+    ).all()
@@ -0,0 +1,88 @@
+# app/services/read_session.py
+import logging
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import g
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.db_config import REPLICA_BIND
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on replica lag: how long a user's reads stay on the primary
+# after they write, and how long a listing read from the replica is cached
+REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS', '10'))
+
+
+def _pin_key(user_id: int) -> str:
+    return f'rw:user:{user_id}'
+
+
+def pin_to_primary(user_id: int) -> None:
+    """
+    Route this user's reads to the primary for REPLICA_MAX_LAG_SECONDS.
+
+    Call after committing a write the user will want to see straight away
+    (booking or releasing a spot), so their active reservation is never
+    read from a replica that has not caught up yet.
+    """
+    if REPLICA_BIND not in db.engines:
+        return
+    try:
+        cache.set(_pin_key(user_id), 1, timeout=REPLICA_MAX_LAG_SECONDS)
+    except Exception as e:
+        logger.error(f"Could not pin user {user_id} to the primary: {e}")
+
+
+def _read_engine(user_id: Optional[int], replica: bool):
+    engine = db.engines.get(REPLICA_BIND) if replica else None
+    if engine is None:
+        return db.engine, False
+    if user_id is not None:
+        try:
+            if cache.get(_pin_key(user_id)):
+                return db.engine, False
+        except Exception as e:
+            # Unknown whether the user just wrote, so stay on the safe side
+            logger.error(f"Could not check primary pin for user {user_id}: {e}")
+            return db.engine, False
+    return engine, True
+
+
+@contextmanager
+def read_only_session(user_id: Optional[int] = None, replica: bool = True):
+    """
+    Yield a short-lived Session whose connection refuses writes.
+
+    Used by reporting and admin listing queries so they can never take
+    the write lock the booking path needs. When a replica is configured
+    the session is bound to it, unless replica=False or user_id names a
+    user pinned to the primary by pin_to_primary(). SQLite gets PRAGMA
+    query_only (reset before the connection returns to the pool);
+    PostgreSQL runs the transaction as READ ONLY.
+    """
+    engine, from_replica = _read_engine(user_id, replica)
+    if from_replica:
+        # Lets cached_lot_listing cap how long replica data is kept
+        g.read_from_replica = True
+
+    connection = engine.connect()
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.exec_driver_sql('PRAGMA query_only = ON')
+    elif dialect == 'postgresql':
+        connection.exec_driver_sql('SET TRANSACTION READ ONLY')
+
+    session = Session(bind=connection)
+    try:
+        yield session
+    finally:
+        session.close()
+        connection.rollback()
+        if dialect == 'sqlite':
+            connection.exec_driver_sql('PRAGMA query_only = OFF')
+        connection.close()
@@ -0,0 +1,115 @@
+# app/services/reservation_export.py
+import csv
+import io
+import zlib
+
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from app.models import ParkingLot, ParkingSpot, Reservation
+from app.services.read_session import read_only_session
+
+EXPORT_HEADER = ['Reservation ID', 'Lot Name', 'Spot ID', 'Start Time', 'End Time', 'Cost', 'Status']
+
+# Rows per chunk handed to the WSGI server / written to disk
+CHUNK_ROWS = 1000
+
+
+def export_query(user_id=None):
+    """
+    Reservations joined to their lot name in one statement, oldest first.
+
+    Spots or lots that have since been deleted come back with a NULL
+    lot name instead of dropping the reservation.
+
+    Args:
+        user_id: Restrict to one user's reservations (None for all users)
+    """
+    query = (
+        select(
+            Reservation.id, Reservation.spot_id, Reservation.start_time,
+            Reservation.end_time, Reservation.cost,
+            ParkingLot.name.label('lot_name')
+        )
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .order_by(Reservation.id)
+    )
+    if user_id is not None:
+        query = query.where(Reservation.user_id == user_id)
+    return query
+
+
+def format_row(row):
+    """Format one export_query row as a dict (the JSON export shape)"""
+    return {
+        'reservation_id': row.id,
+        'lot_name': row.lot_name or 'Unknown',
+        'spot_id': row.spot_id,
+        'start_time': row.start_time.strftime('%Y-%m-%d %H:%M:%S') if row.start_time else '',
+        'end_time': row.end_time.strftime('%Y-%m-%d %H:%M:%S') if row.end_time else '',
+        'cost': row.cost if row.cost else 0,
+        'status': 'Completed' if row.end_time else 'Active'
+    }
+
+
+def iter_rows(session, query):
+    """Stream formatted rows without materializing the result set"""
+    result = session.execute(query.execution_options(yield_per=CHUNK_ROWS))
+    for row in result:
+        yield format_row(row)
+
+
+def iter_csv(rows, compress=False):
+    """
+    Encode formatted rows as CSV, yielding bytes roughly every CHUNK_ROWS
+    rows so memory stays flat however many rows there are.
+
+    Args:
+        rows: Iterable of format_row dicts
+        compress: Emit a gzip stream instead of plain CSV
+    """
+    gzip = zlib.compressobj(wbits=31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain(final=False):
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if gzip:
+            data = gzip.compress(data) + (gzip.flush() if final else b'')
+        return data
+
+    writer.writerow(EXPORT_HEADER)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row.values())
+        if count % CHUNK_ROWS == 0:
+            chunk = drain()
+            if chunk:
+                yield chunk
+    yield drain(final=True)
+
+
+def csv_response(user_id=None, compress=False, filename='parking_history'):
+    """
+    Build a streaming text/csv (or gzip) download of export_query.
+
+    Must be called inside a request; the query runs on a read-only
+    session that stays open only while the body is being streamed.
+    """
+    query = export_query(user_id)
+
+    def generate():
+        with read_only_session(user_id=user_id) as session:
+            yield from iter_csv(iter_rows(session, query), compress=compress)
+
+    if compress:
+        mimetype, filename = 'application/gzip', f'{filename}.csv.gz'
+    else:
+        mimetype, filename = 'text/csv', f'{filename}.csv'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
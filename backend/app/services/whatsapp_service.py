@@ -1,19 +1,88 @@
 # app/services/whatsapp_service.py
+import os
+import random
+import time
 import requests
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from app.services.notification_dispatcher import shared_http_session, shared_rate_limiter, TokenBucket
+from app.task_telemetry import observe_external_call, record_messages
 
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying: rate limited or provider-side failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Most recipients Fonnte accepts in one comma-separated target field
+BROADCAST_BATCH_LIMIT = int(os.environ.get('WHATSAPP_BROADCAST_BATCH_LIMIT', '100'))
+
+DAILY_REMINDER_TEMPLATE = """🚗 *Daily Parking Reminder*
+
+Hello {username}! 👋
+
+Don't forget to book your parking spot today! 
+
+📍 *Available parking lots:* {available_lots}
+⏰ *Best time to book:* Morning hours
+💰 *Save money:* Book early for better rates
+
+Book now and enjoy hassle-free parking! 🎯
+
+*Vehicle Parking App* 🚀"""
+
+def is_valid_number(number) -> bool:
+    """True for a non-empty number that isn't the literal string 'None'"""
+    return bool(number and str(number).strip() and str(number).strip() != 'None')
+
 class WhatsAppService:
     """WhatsApp messaging service using Fonnte API"""
     
-    def __init__(self, api_token: str = "9cDHTvVYGQjqkKHMGCE1"):
+    def __init__(self,
+                 api_token: str = os.environ.get('FONNTE_API_TOKEN', "9cDHTvVYGQjqkKHMGCE1"),
+                 base_url: str = os.environ.get('FONNTE_API_URL', "https://api.fonnte.com/send"),
+                 session: Optional[requests.Session] = None,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 max_retries: int = 3,
+                 backoff: float = 0.5,
+                 timeout: float = 10):
         self.api_token = api_token
-        self.base_url = "https://api.fonnte.com/send"
+        self.base_url = base_url
         self.headers = {
             'Authorization': api_token
         }
+        # Shared across instances so every sender reuses pooled connections
+        # and draws from the same provider quota
+        self.session = session or shared_http_session()
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+    
+    def _post(self, data: Dict) -> requests.Response:
+        """POST to the API, retrying transient failures with jittered backoff"""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                try:
+                    response = self.session.post(
+                        self.base_url,
+                        data=data,
+                        headers=self.headers,
+                        timeout=self.timeout
+                    )
+                finally:
+                    observe_external_call('whatsapp', time.perf_counter() - started)
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    return response
+                logger.warning(f"WhatsApp API returned {response.status_code}, retrying")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"WhatsApp API unreachable ({e}), retrying")
+            attempt += 1
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
     
     def send_message(self, 
                     target_numbers: List[str], 
@@ -42,10 +111,7 @@ class WhatsAppService:
                 }
             
             # Filter out None, empty, or invalid phone numbers
-            valid_numbers = []
-            for number in target_numbers:
-                if number and str(number).strip() and str(number).strip() != 'None':
-                    valid_numbers.append(number)
+            valid_numbers = [number for number in target_numbers if is_valid_number(number)]
             
             if not valid_numbers:
                 return {
@@ -54,15 +120,25 @@ class WhatsAppService:
                     'message': 'WhatsApp message not sent - no valid phone number available'
                 }
             
-            # Format target numbers
-            formatted_targets = []
-            for number in valid_numbers:
-                # Remove any existing country code and add the specified one
-                clean_number = str(number).lstrip('+').lstrip('62').lstrip('0')
-                formatted_targets.append(f"{country_code}{clean_number}")
-            
-            target_string = ",".join(formatted_targets)
-            
+            target_string = ",".join(self._format_number(number, country_code) for number in valid_numbers)
+            return self._send(target_string, message, delay, country_code, len(valid_numbers))
+                
+        except Exception as e:
+            logger.error(f"Unexpected error sending WhatsApp message: {e}")
+            return {
+                'success': False,
+                'error': f"Unexpected error: {str(e)}"
+            }
+    
+    @staticmethod
+    def _format_number(number, country_code: str) -> str:
+        # Remove any existing country code and add the specified one
+        clean_number = str(number).lstrip('+').lstrip('62').lstrip('0')
+        return f"{country_code}{clean_number}"
+    
+    def _send(self, target_string: str, message: str, delay: str, country_code: str, recipients: int) -> Dict:
+        """Post one prepared message to the API and normalize the result"""
+        try:
             # Prepare request data
             data = {
                 'target': target_string,
@@ -72,21 +148,17 @@ class WhatsAppService:
                 'typing': False
             }
             
-            logger.info(f"Sending WhatsApp message to {len(target_numbers)} recipients")
+            logger.info(f"Sending WhatsApp message to {recipients} recipients")
             logger.debug(f"Target numbers: {target_string}")
             logger.debug(f"Message: {message}")
             
             # Make API request
-            response = requests.post(
-                self.base_url,
-                data=data,
-                headers=self.headers,
-                timeout=30
-            )
+            response = self._post(data)
             
             if response.status_code == 200:
                 result = response.json()
                 logger.info(f"WhatsApp message sent successfully. Response: {result}")
+                record_messages(recipients)
                 return {
                     'success': True,
                     'response': result,
@@ -113,6 +185,71 @@ class WhatsAppService:
                 'error': f"Unexpected error: {str(e)}"
             }
     
+    def send_broadcast(self,
+                       template: str,
+                       recipients: List[Tuple],
+                       delay: str = "2",
+                       country_code: str = "91",
+                       batch_size: Optional[int] = None) -> Dict:
+        """
+        Send one templated message to many recipients in as few API calls
+        as possible.
+        
+        Fonnte personalizes each copy server-side: a target written as
+        "number|name|var1|var2" fills {name}, {var1}, {var2}... in the
+        message, so recipients that share a template travel together in
+        batches of up to BROADCAST_BATCH_LIMIT.
+        
+        Args:
+            template: Message using Fonnte placeholders ({name}, {var1}, ...)
+            recipients: Tuples of (phone_number, name, *variables)
+            delay: Delay in seconds between copies
+            country_code: Country code for phone numbers
+            batch_size: Recipients per API call (defaults to the provider limit)
+            
+        Returns:
+            Dict with overall success, batch count and numbers that failed
+        """
+        batch_size = batch_size or BROADCAST_BATCH_LIMIT
+        targets = []
+        for phone_number, *fields in recipients:
+            if is_valid_number(phone_number):
+                # '|' and ',' delimit the target field, so strip them from values
+                values = [str(value).replace('|', ' ').replace(',', ' ') for value in fields]
+                targets.append((phone_number, "|".join([self._format_number(phone_number, country_code)] + values)))
+        
+        failed = []
+        batches = 0
+        for start in range(0, len(targets), batch_size):
+            batch = targets[start:start + batch_size]
+            batches += 1
+            result = self._send(",".join(target for _, target in batch), template, delay, country_code, len(batch))
+            if not result['success']:
+                failed.extend(number for number, _ in batch)
+        
+        return {
+            'success': bool(targets) and not failed,
+            'batches': batches,
+            'sent': len(targets) - len(failed),
+            'failed': failed,
+            'skipped': len(recipients) - len(targets)
+        }
+    
+    def send_daily_reminder_broadcast(self, users, available_lots: int = 0) -> Dict:
+        """
+        Send the daily reminder to many users at once
+        
+        Args:
+            users: Objects with phone_number and username attributes
+            available_lots: Number of available parking lots
+            
+        Returns:
+            Dict containing broadcast result (see send_broadcast)
+        """
+        # Render once; {name} is left for Fonnte to fill per recipient
+        template = DAILY_REMINDER_TEMPLATE.format(username='{name}', available_lots=available_lots)
+        return self.send_broadcast(template, [(user.phone_number, user.username) for user in users])
+    
     def send_daily_reminder(self, 
                            phone_number: str, 
                            username: str,
@@ -136,19 +273,7 @@ class WhatsAppService:
                 'message': f'WhatsApp daily reminder not sent to {username} - no phone number available'
             }
         
-        message = f"""🚗 *Daily Parking Reminder*
-
-Hello {username}! 👋
-
-Don't forget to book your parking spot today! 
-
-📍 *Available parking lots:* {available_lots}
-⏰ *Best time to book:* Morning hours
-💰 *Save money:* Book early for better rates
-
-Book now and enjoy hassle-free parking! 🎯
-
-*Vehicle Parking App* 🚀"""
+        message = DAILY_REMINDER_TEMPLATE.format(username=username, available_lots=available_lots)
 
         return self.send_message([phone_number], message)
     
@@ -164,7 +289,7 @@ Book now and enjoy hassle-free parking! 🎯
         Args:
             phone_number: User's phone number
             username: User's name
-            total_reservations: Number of reservations this week
+            total_reservations: Number of reservations last week
             total_hours: Total hours parked
             total_cost: Total cost spent
             
@@ -183,7 +308,7 @@ Book now and enjoy hassle-free parking! 🎯
 
 Hello {username}! 👋
 
-Here's your parking activity this week:
+Here's your parking activity last week:
 
 📅 *Reservations:* {total_reservations}
 ⏱️ *Total Hours:* {total_hours:.1f}h
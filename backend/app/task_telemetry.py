@@ -0,0 +1,271 @@
+# app/task_telemetry.py
+"""
+Celery task telemetry.
+
+Signal handlers time every task run and collect what the task reports
+through record_rows() and record_messages(), plus the latency of every
+outbound HTTP call made through observe_external_call(). Each run ends
+with one summary log line, and its totals are added to shared metrics
+that /metrics renders next to the web tier's: in a Redis hash when
+REDIS_URL is set, so every worker process contributes, otherwise in this
+process only.
+
+Only the Celery worker calls connect_signals(), so importing this module
+(as /metrics does in every web process) does not load Celery.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.metrics import DEFAULT_BUCKETS, format_labels
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'metrics:tasks'
+
+TASK_DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+HTTP_BUCKETS = DEFAULT_BUCKETS
+
+FAMILIES = {
+    'celery_task_runs_total': ('counter', 'Finished task runs, by task and outcome'),
+    'celery_task_duration_seconds': ('histogram', 'Task run duration'),
+    'celery_task_rows_total': ('counter', 'Rows processed by tasks'),
+    'celery_task_messages_total': ('counter', 'Messages sent by tasks'),
+    'external_request_duration_seconds': ('histogram', 'Outbound HTTP call latency, by service'),
+}
+
+_LE = re.compile(r',?le="([^"]+)"')
+
+
+def _histogram_increments(name: str, labels: Dict, buckets, counts, total: float, count: int) -> Dict[str, float]:
+    """Sample increments for a batch of observations, buckets already cumulative"""
+    increments = {}
+    cumulative = 0
+    for bound, bucket_count in zip(tuple(buckets) + (float('inf'),), counts):
+        cumulative += bucket_count
+        le = '+Inf' if bound == float('inf') else repr(float(bound))
+        increments[f'{name}_bucket{format_labels({**labels, "le": le})}'] = cumulative
+    increments[f'{name}_sum{format_labels(labels)}'] = total
+    increments[f'{name}_count{format_labels(labels)}'] = count
+    return increments
+
+
+class _LocalHistogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricStore:
+    """Sample name -> value, summed across processes through Redis when configured"""
+
+    def __init__(self, redis_url: Optional[str] = os.environ.get('REDIS_URL')):
+        self.redis_url = redis_url
+        self._client = None
+        self._local: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        return self._client
+
+    def add(self, increments: Dict[str, float]) -> None:
+        if self.redis_url:
+            try:
+                pipeline = self._redis().pipeline(transaction=False)
+                for sample, amount in increments.items():
+                    pipeline.hincrbyfloat(METRICS_KEY, sample, amount)
+                pipeline.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Could not record task metrics in Redis ({e}), keeping them in process")
+        with self._lock:
+            for sample, amount in increments.items():
+                self._local[sample] = self._local.get(sample, 0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            values = dict(self._local)
+        if self.redis_url:
+            try:
+                for sample, amount in self._redis().hgetall(METRICS_KEY).items():
+                    sample = sample.decode()
+                    values[sample] = values.get(sample, 0) + float(amount)
+            except Exception as e:
+                logger.warning(f"Could not read task metrics from Redis: {e}")
+        return values
+
+
+store = MetricStore()
+
+
+class TaskRun:
+    """What one task run did, accumulated until task_postrun"""
+
+    def __init__(self, task_name: str):
+        self.task_name = task_name
+        self.started = time.perf_counter()
+        self.failed = False
+        self.rows = 0
+        self.messages = 0
+        self.http: Dict[str, _LocalHistogram] = {}
+        self._lock = threading.Lock()
+
+    def add(self, rows: int = 0, messages: int = 0) -> None:
+        with self._lock:
+            self.rows += rows
+            self.messages += messages
+
+    def observe_http(self, service: str, seconds: float) -> None:
+        with self._lock:
+            self.http.setdefault(service, _LocalHistogram(HTTP_BUCKETS)).observe(seconds)
+
+    def increments(self, duration: float, outcome: str) -> Dict[str, float]:
+        labels = {'task': self.task_name}
+        duration_histogram = _LocalHistogram(TASK_DURATION_BUCKETS)
+        duration_histogram.observe(duration)
+        increments = {
+            f'celery_task_runs_total{format_labels({**labels, "outcome": outcome})}': 1,
+            f'celery_task_rows_total{format_labels(labels)}': self.rows,
+            f'celery_task_messages_total{format_labels(labels)}': self.messages,
+        }
+        increments.update(_histogram_increments(
+            'celery_task_duration_seconds', labels, TASK_DURATION_BUCKETS,
+            duration_histogram.counts, duration, 1))
+        for service, histogram in self.http.items():
+            increments.update(_histogram_increments(
+                'external_request_duration_seconds', {'service': service}, HTTP_BUCKETS,
+                histogram.counts, histogram.total, histogram.count))
+        return increments
+
+    def summary(self, duration: float, outcome: str) -> str:
+        http = ', '.join(
+            f'{service} {histogram.count} calls / {histogram.total:.2f}s'
+            for service, histogram in self.http.items()
+        ) or 'no HTTP calls'
+        return (f"Task {self.task_name} {outcome} in {duration:.2f}s: "
+                f"{self.rows} rows, {self.messages} messages, {http}")
+
+
+_current_run: ContextVar[Optional[TaskRun]] = ContextVar('task_run', default=None)
+_runs: Dict[str, TaskRun] = {}
+
+
+def current_run() -> Optional[TaskRun]:
+    """
+    The task run this code belongs to.
+
+    Worker threads (e.g. the WhatsApp dispatcher pool) do not inherit the
+    context, so they fall back to the only run active in this process.
+    """
+    run = _current_run.get()
+    if run is None and len(_runs) == 1:
+        run = next(iter(_runs.values()), None)
+    return run
+
+
+def record_rows(count: int) -> None:
+    """Count rows processed by the current task run"""
+    run = current_run()
+    if run:
+        run.add(rows=count)
+
+
+def record_messages(count: int) -> None:
+    """Count messages (WhatsApp, email, reports) sent by the current task run"""
+    run = current_run()
+    if run:
+        run.add(messages=count)
+
+
+def observe_external_call(service: str, seconds: float) -> None:
+    """Record one outbound HTTP call; outside a task it is stored straight away"""
+    run = current_run()
+    if run:
+        run.observe_http(service, seconds)
+        return
+    histogram = _LocalHistogram(HTTP_BUCKETS)
+    histogram.observe(seconds)
+    store.add(_histogram_increments(
+        'external_request_duration_seconds', {'service': service}, HTTP_BUCKETS,
+        histogram.counts, histogram.total, histogram.count))
+
+
+def _start_run(task_id=None, task=None, **kwargs):
+    run = TaskRun(task.name)
+    _runs[task_id] = run
+    _current_run.set(run)
+
+
+def _mark_failed(task_id=None, **kwargs):
+    run = _runs.get(task_id)
+    if run:
+        run.failed = True
+
+
+def _finish_run(task_id=None, task=None, state=None, **kwargs):
+    run = _runs.pop(task_id, None)
+    _current_run.set(None)
+    if run is None:
+        return
+    duration = time.perf_counter() - run.started
+    outcome = 'failure' if run.failed else (state or 'SUCCESS').lower()
+    logger.info(run.summary(duration, outcome))
+    store.add(run.increments(duration, outcome))
+
+
+def connect_signals() -> None:
+    """Hook the run handlers into Celery; called once by the worker entry point"""
+    from celery.signals import task_failure, task_postrun, task_prerun
+
+    task_prerun.connect(_start_run, weak=False)
+    task_failure.connect(_mark_failed, weak=False)
+    task_postrun.connect(_finish_run, weak=False)
+
+
+def _family(sample: str) -> Optional[str]:
+    name = sample.split('{', 1)[0]
+    for suffix in ('', '_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:len(name) - len(suffix)] in FAMILIES:
+            return name[:len(name) - len(suffix)]
+    return None
+
+
+def _sample_order(sample: str):
+    # Series together, buckets by numeric bound, then _sum and _count
+    le = _LE.search(sample)
+    series = _LE.sub('', sample).split('{', 1)[-1]
+    bound = float(le.group(1).replace('+Inf', 'inf')) if le else float('inf')
+    rank = 0 if le else 1 if '_sum{' in sample else 2
+    return series, rank, bound, sample
+
+
+def render_task_metrics():
+    """Exposition lines for every task metric recorded so far"""
+    families: Dict[str, list] = {}
+    for sample, value in store.snapshot().items():
+        family = _family(sample)
+        if family:
+            families.setdefault(family, []).append((sample, value))
+
+    lines = []
+    for family, samples in sorted(families.items()):
+        kind, documentation = FAMILIES[family]
+        lines += [f'# HELP {family} {documentation}', f'# TYPE {family} {kind}']
+        for sample, value in sorted(samples, key=lambda item: _sample_order(item[0])):
+            lines.append(f'{sample} {int(value) if value == int(value) else value}')
+    return lines
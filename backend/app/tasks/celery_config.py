@@ -1,11 +1,24 @@
 # app/tasks/celery_config.py
+import os
+
 from celery import Celery
 
+TASK_MODULES = [
+    'app.tasks.csv_export',
+    'app.tasks.daily_reminder',
+    'app.tasks.monthly_report',
+    'app.tasks.notification_outbox',
+]
+
 def make_celery(app_name='vehicle_parking_app'):
+    # CELERY_BROKER_URL / CELERY_RESULT_BACKEND win; otherwise both use REDIS_URL
+    redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     return Celery(
         app_name,
-        broker='redis://localhost:6379/0',
-        backend='redis://localhost:6379/0'
+        broker=os.environ.get('CELERY_BROKER_URL', redis_url),
+        backend=os.environ.get('CELERY_RESULT_BACKEND', redis_url),
+        # Imported by the worker at startup so every task it may be sent is registered
+        include=TASK_MODULES
     )
 
 celery = make_celery()
@@ -1,34 +1,94 @@
 # app/tasks/csv_export.py
-import csv
+import os
 from datetime import datetime
+from sqlalchemy import func, select
 from app.tasks.celery_config import celery
-from app import db
-from app.models import Reservation, ParkingSpot, ParkingLot, User
-import os
+from app.models import Reservation
+from app.services.read_session import read_only_session
+from app.services.reservation_export import export_query, format_row, iter_csv
+from app.task_telemetry import record_rows
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+
+# Reservations fetched per keyset page
+BATCH_SIZE = 5000
+
+def _keyset_batches(session, user_id, on_batch):
+    """Yield export rows page by page, seeking on reservation id"""
+    last_id = 0
+    while True:
+        query = export_query(user_id).where(Reservation.id > last_id).limit(BATCH_SIZE)
+        batch = session.execute(query).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        on_batch(len(batch))
+        yield [format_row(row) for row in batch]
+
+def _write_csv_gz(path, batches):
+    rows = (row for batch in batches for row in batch)
+    with open(path, 'wb') as file:
+        for chunk in iter_csv(rows, compress=True):
+            file.write(chunk)
+
+def _write_parquet(path, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('reservation_id', pa.int64()),
+        ('lot_name', pa.string()),
+        ('spot_id', pa.int64()),
+        ('start_time', pa.string()),
+        ('end_time', pa.string()),
+        ('cost', pa.float64()),
+        ('status', pa.string()),
+    ])
+    with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+@celery.task(bind=True)
+def export_reservations_csv(self, user_id, file_format='csv'):
+    """
+    Export a user's reservations to EXPORT_DIR in bounded-memory batches.
 
-@celery.task
-def export_reservations_csv(user_id):
-    reservations = Reservation.query.filter_by(user_id=user_id).all()
-    user = User.query.get(user_id)
+    Progress is published as a PROGRESS state with {'done', 'total'} so
+    the export-jobs endpoint can poll it. file_format='parquet' writes
+    Parquet when pyarrow is installed and falls back to gzip CSV otherwise.
+    """
+    if file_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            file_format = 'csv'
 
-    filename = f"reservation_export_user_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
-    file_path = os.path.join('exports', filename)
+    extension = 'parquet' if file_format == 'parquet' else 'csv.gz'
+    filename = f"reservation_export_user_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{extension}"
+    file_path = os.path.join(EXPORT_DIR, filename)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
 
-    os.makedirs('exports', exist_ok=True)
+    with read_only_session(user_id=user_id) as session:
+        total = session.execute(
+            select(func.count(Reservation.id)).where(Reservation.user_id == user_id)
+        ).scalar()
+        progress = {'done': 0, 'total': total}
 
-    with open(file_path, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Spot ID', 'Lot Name', 'Start Time', 'End Time', 'Cost'])
+        def on_batch(size):
+            progress['done'] += size
+            record_rows(size)
+            self.update_state(state='PROGRESS', meta=dict(progress))
 
-        for res in reservations:
-            spot = ParkingSpot.query.get(res.spot_id)
-            lot = ParkingLot.query.get(spot.lot_id)
-            writer.writerow([
-                res.spot_id,
-                lot.name,
-                res.start_time,
-                res.end_time,
-                res.cost
-            ])
+        batches = _keyset_batches(session, user_id, on_batch)
+        if file_format == 'parquet':
+            _write_parquet(file_path, batches)
+        else:
+            _write_csv_gz(file_path, batches)
 
-    return {'message': 'CSV export completed', 'file_path': file_path}
+    return {
+        'message': 'CSV export completed',
+        'file_path': file_path,
+        'format': file_format,
+        'user_id': user_id,
+        'rows': progress['done']
+    }
@@ -1,7 +1,14 @@
 # app/tasks/daily_reminder.py
 from app.tasks.celery_config import celery
 from app.models import db, User, Reservation, ParkingLot, ParkingSpot
+from app.services.lot_counters import count_available_lots
+from app.services.notification_dispatcher import WhatsAppDispatcher
+from app.services.whatsapp_service import WhatsAppService, is_valid_number
+from app.services.period_summary import period_start, period_totals, refresh_period_summaries
+from app.services.read_session import read_only_session
+from app.task_telemetry import record_rows
 from datetime import datetime, timedelta
+from sqlalchemy import exists, select
 import logging
 import sys
 import os
@@ -13,24 +20,59 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Users handed to the sender per batch
+REMINDER_BATCH_SIZE = 500
+
+def reminder_query(cutoff, after=0, batch_size=REMINDER_BATCH_SIZE):
+    """
+    One batch of users, by id after `after`, whose latest booking started
+    before cutoff (or who never booked).
+
+    "Latest booking before cutoff" is checked as "no booking since cutoff",
+    a correlated NOT EXISTS that seeks ix_reservation_user_start for each
+    user in the batch instead of grouping the whole reservation history.
+    """
+    booked_since = exists().where(Reservation.user_id == User.id, Reservation.start_time >= cutoff)
+    return (
+        select(User.id, User.username, User.email, User.phone_number)
+        .where(User.role == 'user', User.id > after, ~booked_since)
+        .order_by(User.id)
+        .limit(batch_size)
+    )
+
+def reminder_targets(cutoff, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Yield batches of reminder targets paged by user id.
+
+    Each batch is read in its own short read-only session, closed before
+    the batch is yielded, so no transaction stays open while the caller
+    talks to WhatsApp.
+    """
+    last_id = 0
+    while True:
+        with read_only_session() as session:
+            batch = session.execute(reminder_query(cutoff, last_id, batch_size)).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+
 @celery.task
 def send_daily_reminders():
     """Send daily reminders to users who haven't booked parking recently"""
     try:
         logger.info("Starting daily reminder task...")
         
-        users = User.query.filter_by(role='user').all()
         yesterday = datetime.utcnow() - timedelta(days=1)
         reminder_count = 0
 
-        for user in users:
-            # Get the user's most recent reservation
-            last_res = Reservation.query.filter_by(user_id=user.id).order_by(Reservation.start_time.desc()).first()
-            
-            # Send reminder if user has no reservations or last reservation was more than 1 day ago
-            if not last_res or (last_res and last_res.start_time < yesterday):
-                reminder_count += 1
-                send_reminder_to_user(user)
+        whatsapp = WhatsAppService()
+        with read_only_session() as session:
+            available_lots = count_available_lots(session)
+        for batch in reminder_targets(yesterday):
+            send_reminder_batch(batch, available_lots, whatsapp)
+            reminder_count += len(batch)
+            record_rows(len(batch))
         
         logger.info(f"Daily reminder task completed. Sent {reminder_count} reminders.")
         return f"Sent {reminder_count} reminders"
@@ -39,26 +81,38 @@ def send_daily_reminders():
         logger.error(f"Error in daily reminder task: {e}")
         raise
 
-def send_reminder_to_user(user):
+def send_reminder_batch(users, available_lots, whatsapp):
+    """Broadcast the reminder to a batch of users in as few API calls as possible"""
+    with_phone = [user for user in users if is_valid_number(user.phone_number)]
+    for user in users:
+        if not is_valid_number(user.phone_number):
+            logger.info(f"[DAILY REMINDER] Hello {user.username}, don't forget to book your parking spot today!")
+            print(f"📧 Console reminder for {user.username} ({user.email}): No WhatsApp number available")
+
+    if not with_phone:
+        return
+    result = whatsapp.send_daily_reminder_broadcast(with_phone, available_lots)
+    if result['success']:
+        logger.info(f"✅ WhatsApp reminders sent to {result['sent']} users in {result['batches']} API calls")
+    else:
+        logger.error(f"❌ WhatsApp reminders failed for {len(result['failed'])} of {len(with_phone)} users")
+
+def send_reminder_to_user(user, available_lots=None, whatsapp=None):
     """Send a reminder to a specific user via WhatsApp"""
     try:
-        # Get available parking lots count
-        available_lots = 0
-        try:
-            lots = ParkingLot.query.all()
-            for lot in lots:
-                available_spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                if available_spots > 0:
-                    available_lots += 1
-        except Exception as e:
-            logger.warning(f"Could not get available lots count: {e}")
-            available_lots = 3  # Default fallback
+        # Callers sending many reminders pass the lot count in once per run
+        if available_lots is None:
+            try:
+                available_lots = count_available_lots()
+            except Exception as e:
+                logger.warning(f"Could not get available lots count: {e}")
+                available_lots = 3  # Default fallback
         
         # Send WhatsApp message if phone number is available
         if user.phone_number and user.phone_number.strip() and user.phone_number.strip() != 'None':
             try:
                 from app.services.whatsapp_service import WhatsAppService
-                whatsapp = WhatsAppService()
+                whatsapp = whatsapp or WhatsAppService()
                 
                 result = whatsapp.send_daily_reminder(
                     phone_number=user.phone_number,
@@ -90,24 +144,24 @@ def send_reminder_to_user(user):
 
 @celery.task
 def send_weekly_summary():
-    """Send weekly summary to all users"""
+    """Send last week's summary to every user who parked, from the period summary table"""
     try:
         logger.info("Starting weekly summary task...")
         
-        users = User.query.filter_by(role='user').all()
-        summary_count = 0
-
-        for user in users:
-            # Get user's reservations from the last week
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            recent_reservations = Reservation.query.filter(
-                Reservation.user_id == user.id,
-                Reservation.start_time >= week_ago
-            ).all()
-            
-            if recent_reservations:
-                send_weekly_summary_to_user(user, recent_reservations)
-                summary_count += 1
+        refresh_period_summaries()
+        # The last complete Monday-Sunday week; runs on Monday morning
+        week_start = period_start(datetime.utcnow().date(), 'week') - timedelta(days=7)
+        summaries = period_totals('week', week_start)
+        record_rows(len(summaries))
+        
+        dispatcher = WhatsAppDispatcher()
+        dispatcher.map(
+            lambda row: send_weekly_summary_to_user(
+                row, row.reservations, row.total_hours, row.total_cost, whatsapp=dispatcher.service
+            ),
+            summaries
+        )
+        summary_count = len(summaries)
         
         logger.info(f"Weekly summary task completed. Sent {summary_count} summaries.")
         return f"Sent {summary_count} weekly summaries"
@@ -116,35 +170,26 @@ def send_weekly_summary():
         logger.error(f"Error in weekly summary task: {e}")
         raise
 
-def send_weekly_summary_to_user(user, reservations):
+def send_weekly_summary_to_user(user, total_reservations, total_hours, total_cost, whatsapp=None):
     """Send weekly summary to a specific user via WhatsApp"""
     try:
-        total_cost = sum(r.cost or 0 for r in reservations)
-        
-        # Calculate total hours from reservations
-        total_hours = 0
-        for res in reservations:
-            if res.end_time and res.start_time:
-                duration = (res.end_time - res.start_time).total_seconds() / 3600
-                total_hours += duration
-        
         # Send WhatsApp message if phone number is available
         if user.phone_number and user.phone_number.strip() and user.phone_number.strip() != 'None':
             try:
                 from app.services.whatsapp_service import WhatsAppService
-                whatsapp = WhatsAppService()
+                whatsapp = whatsapp or WhatsAppService()
                 
                 result = whatsapp.send_weekly_summary(
                     phone_number=user.phone_number,
                     username=user.username,
-                    total_reservations=len(reservations),
+                    total_reservations=total_reservations,
                     total_hours=total_hours,
                     total_cost=total_cost
                 )
                 
                 if result['success']:
                     logger.info(f"✅ WhatsApp weekly summary sent to {user.username} ({user.phone_number})")
-                    print(f"📱 WhatsApp weekly summary sent to {user.username}: {len(reservations)} reservations, ₹{total_cost:.2f}")
+                    print(f"📱 WhatsApp weekly summary sent to {user.username}: {total_reservations} reservations, ₹{total_cost:.2f}")
                 else:
                     logger.error(f"❌ WhatsApp weekly summary failed for {user.username}: {result.get('error', 'Unknown error')}")
                     print(f"❌ WhatsApp weekly summary failed for {user.username}: {result.get('error', 'Unknown error')}")
@@ -157,23 +202,19 @@ def send_weekly_summary_to_user(user, reservations):
                 print(f"❌ Error sending WhatsApp weekly summary to {user.username}: {e}")
         else:
             # Fallback to console logging if no phone number
-            message = f"""
-            [WEEKLY SUMMARY] Hello {user.username}!
-            
-            Your parking activity this week:
-            - Reservations: {len(reservations)}
-            - Total hours: {total_hours:.1f}h
-            - Total cost: ₹{total_cost:.2f}
-            
-            Keep up the great parking habits!
-            """
-            
-            logger.info(f"Weekly summary for {user.username}: {len(reservations)} reservations, ₹{total_cost:.2f}")
+            logger.info(f"Weekly summary for {user.username}: {total_reservations} reservations, ₹{total_cost:.2f}")
             print(f"📊 Console weekly summary for {user.username}: No WhatsApp number available")
         
     except Exception as e:
         logger.error(f"Error sending weekly summary to user {user.username}: {e}")
 
+@celery.task
+def refresh_summaries():
+    """Incrementally refresh the per-user day/week/month summary table"""
+    result = refresh_period_summaries()
+    logger.info(f"Period summaries refreshed: {result}")
+    return result
+
 # Schedule tasks
 @celery.task
 def schedule_daily_reminders():
@@ -185,7 +226,7 @@ def schedule_daily_reminders():
 
 @celery.task
 def schedule_weekly_summaries():
-    """Schedule weekly summaries every Sunday at 10 AM"""
+    """Schedule weekly summaries every Monday at 10 AM"""
     from celery.schedules import crontab
     
     # This will be called by the scheduler
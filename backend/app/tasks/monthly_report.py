@@ -1,37 +1,117 @@
 # app/tasks/monthly_report.py
 from app.tasks.celery_config import celery
-from app.models import db, User, Reservation, ParkingSpot, ParkingLot
-from datetime import datetime, timedelta
-from flask import render_template_string
+from app.models import User, Reservation, ParkingSpot, ParkingLot
+from app.services.read_session import read_only_session
+from app.task_telemetry import record_messages, record_rows
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, func, select
 
-@celery.task
-def send_monthly_report():
-    users = User.query.filter_by(role='user').all()
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-
-    for user in users:
-        reservations = Reservation.query.filter(
-            Reservation.user_id == user.id,
-            Reservation.start_time >= start_of_month
-        ).all()
+# Users aggregated and delivered per chunk
+REPORT_CHUNK_SIZE = 500
 
-        total_cost = sum(r.cost or 0 for r in reservations)
-        most_visited = {}
-        for r in reservations:
-            spot = ParkingSpot.query.get(r.spot_id)
-            lot = ParkingLot.query.get(spot.lot_id)
-            most_visited[lot.name] = most_visited.get(lot.name, 0) + 1
-
-        most_used_lot = max(most_visited, key=most_visited.get) if most_visited else "N/A"
-
-        html = render_template_string("""
+MONTHLY_REPORT_TEMPLATE = """
             <h2>Monthly Parking Report</h2>
             <p>User: {{ user.username }}</p>
             <p>Total Reservations: {{ count }}</p>
             <p>Most Used Lot: {{ lot }}</p>
             <p>Total Spent: ₹{{ cost }}</p>
-        """, user=user, count=len(reservations), lot=most_used_lot, cost=round(total_cost, 2))
+        """
+
+def monthly_report_query(since, after=None, through=None):
+    """
+    One row per user with their reservation count, total cost and most
+    visited lot since `since`, all computed in SQL.
+
+    The most visited lot is the per-user mode: visits are counted per
+    (user, lot) and ranked with ROW_NUMBER() so ties go to the lower lot id.
+
+    after/through limit the report to user ids in (after, through]. The
+    range is applied inside both aggregates too, so a chunk only reads its
+    own users' reservations.
+    """
+    def for_users(query, user_id):
+        if after is not None:
+            query = query.where(user_id > after)
+        if through is not None:
+            query = query.where(user_id <= through)
+        return query
 
-        print(f"\n--- Monthly Report for {user.username} ---\n{html}\n")
+    totals = (
+        select(
+            Reservation.user_id,
+            func.count(Reservation.id).label('count'),
+            func.coalesce(func.sum(Reservation.cost), 0).label('cost')
+        )
+        .where(Reservation.start_time >= since)
+        .group_by(Reservation.user_id)
+    )
+    totals = for_users(totals, Reservation.user_id).subquery()
+    visits = func.count(Reservation.id)
+    ranked_lots = (
+        select(
+            Reservation.user_id,
+            ParkingSpot.lot_id,
+            func.row_number().over(
+                partition_by=Reservation.user_id,
+                order_by=(visits.desc(), ParkingSpot.lot_id)
+            ).label('rank')
+        )
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .where(Reservation.start_time >= since)
+        .group_by(Reservation.user_id, ParkingSpot.lot_id)
+    )
+    ranked_lots = for_users(ranked_lots, Reservation.user_id).subquery()
+    query = (
+        select(
+            User.id, User.username, User.email,
+            func.coalesce(totals.c.count, 0).label('count'),
+            func.coalesce(totals.c.cost, 0).label('cost'),
+            ParkingLot.name.label('lot_name')
+        )
+        .outerjoin(totals, totals.c.user_id == User.id)
+        .outerjoin(ranked_lots, and_(ranked_lots.c.user_id == User.id, ranked_lots.c.rank == 1))
+        .outerjoin(ParkingLot, ParkingLot.id == ranked_lots.c.lot_id)
+        .where(User.role == 'user')
+        .order_by(User.id)
+    )
+    return for_users(query, User.id)
+
+def monthly_report_chunks(session, since, chunk_size=REPORT_CHUNK_SIZE):
+    """Yield report rows in chunks, aggregating one user id range at a time"""
+    last_id = 0
+    while True:
+        user_ids = session.execute(
+            select(User.id).where(User.role == 'user', User.id > last_id).order_by(User.id).limit(chunk_size)
+        ).scalars().all()
+        if not user_ids:
+            return
+        yield session.execute(monthly_report_query(since, after=last_id, through=user_ids[-1])).all()
+        last_id = user_ids[-1]
+
+def deliver_reports(reports):
+    """Hand one chunk of rendered (row, html) reports to the delivery channel"""
+    for row, html in reports:
+        print(f"\n--- Monthly Report for {row.username} ---\n{html}\n")
         # TODO: Send this via email using Flask-Mail or SMTP
+        record_messages(1)
+
+@celery.task
+def send_monthly_report():
+    now = datetime.utcnow()
+    start_of_month = datetime(now.year, now.month, 1)
+
+    # Compiled once per run instead of once per user
+    template = current_app.jinja_env.from_string(MONTHLY_REPORT_TEMPLATE)
+
+    report_count = 0
+    with read_only_session() as session:
+        for chunk in monthly_report_chunks(session, start_of_month):
+            deliver_reports(
+                (row, template.render(user=row, count=row.count, lot=row.lot_name or "N/A", cost=round(row.cost, 2)))
+                for row in chunk
+            )
+            report_count += len(chunk)
+            record_rows(len(chunk))
+
+    return f"Sent {report_count} monthly reports"
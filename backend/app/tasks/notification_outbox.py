@@ -0,0 +1,26 @@
+# app/tasks/notification_outbox.py
+from app.tasks.celery_config import celery
+from app.services.notification_outbox import drain_outbox, OUTBOX_BATCH_SIZE
+from app.task_telemetry import record_rows
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Batches drained per task run before yielding back to the scheduler
+MAX_BATCHES_PER_RUN = 50
+
+@celery.task
+def drain_notification_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Deliver pending booking/release notifications from the outbox"""
+    totals = {'claimed': 0, 'sent': 0, 'skipped': 0, 'failed': 0}
+    for _ in range(MAX_BATCHES_PER_RUN):
+        stats = drain_outbox(batch_size)
+        for key, value in stats.items():
+            totals[key] += value
+        record_rows(stats['claimed'])
+        if stats['claimed'] < batch_size:
+            break
+
+    if totals['claimed']:
+        logger.info(f"Notification outbox drained: {totals}")
+    return totals
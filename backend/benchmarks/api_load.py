@@ -0,0 +1,367 @@
+# benchmarks/api_load.py
+"""
+Load benchmark for the booking and listing APIs.
+
+Seeds a scratch database with a synthetic dataset (lots, spots, users and
+years of completed reservations) using bulk inserts, then drives a
+weighted mix of book, release, available-lots, history, admin
+reservations and spot-status requests from concurrent workers through the
+Flask test client. Reports throughput, p50/p95/p99 latency and SQL
+statements per request for each endpoint, writes the run as a JSON
+baseline and compares it with the previous one.
+
+The load generator runs in the same process as the app, so the numbers
+are for comparing runs on the same machine, not for sizing a server.
+
+    python -m benchmarks.api_load
+    python -m benchmarks.api_load --users 20000 --years 5 --reservations 1000000 --workers 16
+    python -m benchmarks.api_load --baseline benchmarks/results/api_load-20260101-120000.json --max-regression 15
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from app import create_app, db
+from app.instrumentation import track_queries
+from app.models import User, ParkingLot, ParkingSpot, Reservation
+from app.seed import init_db
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')  # gitignored
+
+# Rows per INSERT ... VALUES batch while seeding
+INSERT_CHUNK = 10000
+
+# Extra SQL statements per request (on average) reported as a regression
+QUERY_REGRESSION = 1
+
+# Relative frequency of each operation in the request mix
+DEFAULT_MIX = {
+    'book': 2,
+    'release': 2,
+    'available-lots': 6,
+    'history': 4,
+    'admin-reservations': 1,
+    'spot-status': 1,
+}
+
+
+def _chunks(rows, size=INSERT_CHUNK):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed(rng, lots, spots_per_lot, users, years, reservations):
+    """Bulk-insert the dataset; every spot starts available"""
+    db.session.execute(insert(ParkingLot), [
+        {
+            'name': f'Bench Lot {i}',
+            'address': f'{i} Benchmark Road',
+            'pin_code': f'{100000 + i}',
+            'price_per_hour': float(rng.choice((10, 20, 30, 40, 50))),
+            'total_spots': spots_per_lot,
+            'available_count': spots_per_lot,
+            'occupied_count': 0,
+        }
+        for i in range(lots)
+    ])
+    lot_prices = dict(db.session.execute(
+        select(ParkingLot.id, ParkingLot.price_per_hour).where(ParkingLot.name.like('Bench Lot %'))
+    ).all())
+    spot_rows = [{'lot_id': lot_id, 'status': 'A'} for lot_id in lot_prices for _ in range(spots_per_lot)]
+    for chunk in _chunks(spot_rows):
+        db.session.execute(insert(ParkingSpot), chunk)
+
+    user_rows = [
+        {'username': f'bench{i}', 'password': 'x', 'email': f'bench{i}@example.com', 'role': 'user'}
+        for i in range(users)
+    ]
+    for chunk in _chunks(user_rows):
+        db.session.execute(insert(User), chunk)
+
+    spots = db.session.execute(
+        select(ParkingSpot.id, ParkingSpot.lot_id).where(ParkingSpot.lot_id.in_(list(lot_prices)))
+    ).all()
+    user_ids = db.session.execute(select(User.id).where(User.username.like('bench%'))).scalars().all()
+
+    # Completed reservations spread over the last `years`, ending before now
+    now = datetime.utcnow()
+    span = years * 365 * 24 * 3600
+    batch = []
+    for _ in range(reservations):
+        spot = rng.choice(spots)
+        start = now - timedelta(seconds=rng.uniform(3600 * 12, span))
+        hours = rng.uniform(0.25, 10)
+        batch.append({
+            'spot_id': spot.id,
+            'user_id': rng.choice(user_ids),
+            'start_time': start,
+            'end_time': start + timedelta(hours=hours),
+            'cost': round(hours * lot_prices[spot.lot_id], 2),
+        })
+        if len(batch) == INSERT_CHUNK:
+            db.session.execute(insert(Reservation), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Reservation), batch)
+    db.session.commit()
+    return sorted(lot_prices), user_ids
+
+
+def bearer(user_id, role='user'):
+    """Authorization header the frontend would send for this user"""
+    token = create_access_token(identity=str(user_id), additional_claims={'role': role})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = math.ceil(fraction * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class LoadGenerator:
+    """Concurrent workers issuing a weighted request mix, each with its own users"""
+
+    def __init__(self, client, lot_ids, user_ids, headers, admin_headers, mix, workers, seed):
+        self.client = client
+        self.headers = headers
+        self.admin_headers = admin_headers
+        self.lot_ids = lot_ids
+        self.user_ids = user_ids
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.workers = workers
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        # Disjoint (idle, booked) users per worker, so book/release pairs never race
+        # each other; kept across runs so warmup bookings are released later
+        self._users = [(list(user_ids[index::workers]), []) for index in range(workers)]
+        self._rngs = [random.Random(seed * 1000 + index) for index in range(workers)]
+        self._lock = threading.Lock()
+
+    def _request(self, name, method, url, **kwargs):
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = getattr(self.client, method)(url, **kwargs)
+            response.close()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append((elapsed, stats.count))
+            self.statuses[name][response.status_code] += 1
+        return response.status_code
+
+    def _worker(self, index, requests):
+        rng = self._rngs[index]
+        idle, active = self._users[index]
+        for _ in range(requests):
+            name = rng.choices(self.operations, self.weights)[0]
+            if name == 'book' and not idle:
+                name = 'release'
+            elif name == 'release' and not active:
+                name = 'book'
+
+            if name == 'book':
+                user_id = idle.pop(rng.randrange(len(idle)))
+                status = self._request(name, 'post', '/api/user/book', headers=self.headers[user_id],
+                                       json={'lot_id': rng.choice(self.lot_ids), 'user_id': user_id})
+                (active if status == 200 else idle).append(user_id)
+            elif name == 'release':
+                user_id = active.pop(rng.randrange(len(active)))
+                self._request(name, 'post', '/api/user/release', headers=self.headers[user_id],
+                              json={'user_id': user_id})
+                idle.append(user_id)
+            elif name == 'available-lots':
+                self._request(name, 'get', '/api/user/available-lots')
+            elif name == 'history':
+                user_id = rng.choice(self.user_ids)
+                self._request(name, 'get', f'/api/user/history/{user_id}', headers=self.headers[user_id])
+            elif name == 'admin-reservations':
+                self._request(name, 'get', '/api/admin/reservations', headers=self.admin_headers)
+            elif name == 'spot-status':
+                self._request(name, 'get', '/api/admin/spot-status', headers=self.admin_headers)
+
+    def run(self, requests):
+        shares = [requests // self.workers + (1 if i < requests % self.workers else 0) for i in range(self.workers)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in [pool.submit(self._worker, i, share) for i, share in enumerate(shares)]:
+                future.result()
+        return time.perf_counter() - started
+
+    def reset(self):
+        self.samples.clear()
+        self.statuses.clear()
+
+
+def summarize(generator, elapsed):
+    endpoints = {}
+    for name in sorted(generator.samples):
+        latencies = sorted(seconds for seconds, _ in generator.samples[name])
+        queries = [count for _, count in generator.samples[name]]
+        statuses = generator.statuses[name]
+        endpoints[name] = {
+            'requests': len(latencies),
+            'throughput': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {'requests': total, 'seconds': round(elapsed, 3), 'throughput': round(total / elapsed, 1),
+            'endpoints': endpoints}
+
+
+def latest_baseline():
+    paths = sorted(glob.glob(os.path.join(BASELINE_DIR, 'api_load-*.json')))
+    return paths[-1] if paths else None
+
+
+def _change(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def compare(previous, current, max_regression):
+    """Print per-endpoint changes and return the regressions beyond max_regression percent"""
+    if previous['config'] != current['config']:
+        print("[WARN] Baseline was recorded with a different dataset or mix; changes are indicative only")
+    print(f"[INFO] Throughput {previous['results']['throughput']} -> {current['results']['throughput']} req/s "
+          f"({_change(previous['results']['throughput'], current['results']['throughput'])})")
+
+    regressions = []
+    for name, new in current['results']['endpoints'].items():
+        old = previous['results']['endpoints'].get(name)
+        if old is None:
+            continue
+        print(f"[INFO] {name:<20} p95 {old['p95_ms']:>8.2f} -> {new['p95_ms']:>8.2f} ms "
+              f"({_change(old['p95_ms'], new['p95_ms']):>7}), "
+              f"queries {old['queries_mean']:>5.2f} -> {new['queries_mean']:>5.2f}")
+        if old['p95_ms'] and (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 > max_regression:
+            regressions.append(f"{name} p95 {_change(old['p95_ms'], new['p95_ms'])}")
+        if new['queries_mean'] - old['queries_mean'] >= QUERY_REGRESSION:
+            regressions.append(f"{name} issues {new['queries_mean']} statements per request (was {old['queries_mean']})")
+    return regressions
+
+
+def print_results(results):
+    print(f"[INFO] {results['requests']} requests in {results['seconds']:.2f}s ({results['throughput']:.0f} req/s)")
+    print(f"[INFO] {'endpoint':<20} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'queries':>8}  statuses")
+    for name, endpoint in results['endpoints'].items():
+        print(f"[INFO] {name:<20} {endpoint['requests']:>8} {endpoint['throughput']:>8.1f} {endpoint['p50_ms']:>8.2f} "
+              f"{endpoint['p95_ms']:>8.2f} {endpoint['p99_ms']:>8.2f} {endpoint['queries_mean']:>8.2f}  "
+              f"{endpoint['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=20)
+    parser.add_argument('--spots-per-lot', type=int, default=50)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=3, help='span of the historical reservations')
+    parser.add_argument('--reservations', type=int, default=100000, help='historical (completed) reservations')
+    parser.add_argument('--requests', type=int, default=3000, help='measured requests across all workers')
+    parser.add_argument('--warmup', type=int, default=200, help='requests issued before measuring')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mix', type=json.loads, default=DEFAULT_MIX,
+                        help=f'JSON operation weights, default {json.dumps(DEFAULT_MIX)}')
+    parser.add_argument('--database-url', help='defaults to a scratch SQLite file')
+    parser.add_argument('--output', help=f'result file, defaults to a new file in {BASELINE_DIR}')
+    parser.add_argument('--baseline', help='result file to compare with, defaults to the latest in the baseline directory')
+    parser.add_argument('--max-regression', type=float, default=20.0,
+                        help='exit non-zero when an endpoint p95 grows by more than this percent')
+    args = parser.parse_args()
+
+    unknown = set(args.mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f"unknown operations in --mix: {', '.join(sorted(unknown))}")
+
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        database_url = f'sqlite:///{scratch.name}'
+
+    # Concurrent writers on one SQLite file queue on its lock; give them room to wait
+    os.environ.setdefault('SQLITE_BUSY_TIMEOUT_MS', '30000')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'INIT_DB_ON_STARTUP': False})
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        init_db()
+        started = time.perf_counter()
+        lot_ids, user_ids = seed(rng, args.lots, args.spots_per_lot, args.users, args.years, args.reservations)
+        print(f"[INFO] Seeded {args.lots} lots, {args.lots * args.spots_per_lot} spots, {args.users} users and "
+              f"{args.reservations} reservations in {time.perf_counter() - started:.1f}s")
+        dialect = db.engine.dialect.name
+        headers = {user_id: bearer(user_id) for user_id in user_ids}
+        admin_headers = bearer(0, role='admin')
+
+    generator = LoadGenerator(app.test_client(), lot_ids, user_ids, headers, admin_headers,
+                              args.mix, args.workers, args.seed)
+    if args.warmup:
+        generator.run(args.warmup)
+        generator.reset()
+    results = summarize(generator, generator.run(args.requests))
+    print_results(results)
+
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    if scratch:
+        os.unlink(scratch.name)
+
+    config = {key: getattr(args, key) for key in
+              ('lots', 'spots_per_lot', 'users', 'years', 'reservations', 'requests', 'warmup', 'workers', 'seed', 'mix')}
+    run = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'config': config,
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'database': dialect},
+        'results': results,
+    }
+
+    baseline = args.baseline or latest_baseline()
+    output = args.output or os.path.join(BASELINE_DIR, f"api_load-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"[INFO] Results written to {output}")
+
+    if not baseline:
+        print("[INFO] No previous baseline to compare with")
+        return
+    with open(baseline) as f:
+        previous = json.load(f)
+    print(f"[INFO] Comparing with {baseline}")
+    regressions = compare(previous, run, args.max_regression)
+    if regressions:
+        for regression in regressions:
+            print(f"[ERROR] {regression}")
+        sys.exit(1)
+    print("[INFO] No regressions beyond the threshold")
+
+
+if __name__ == '__main__':
+    main()
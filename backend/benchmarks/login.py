@@ -0,0 +1,80 @@
+# benchmarks/login.py
+"""
+Login throughput benchmark.
+
+For each PASSWORD_HASH_METHOD, a fresh interpreter creates one user in a
+scratch SQLite database and times sequential POST /api/auth/login calls
+on a single thread, which gives logins per second per core. Token
+refreshes (POST /api/auth/refresh, no password hash) are timed alongside
+for comparison.
+
+    python -m benchmarks.login --logins 20
+    python -m benchmarks.login --methods scrypt pbkdf2:sha256:600000 pbkdf2:sha256:100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SAMPLE = """
+import json, sys, time
+from app import create_app, db
+from app.models import User
+from app.seed import init_db
+from app.services.passwords import hash_password
+
+database_url, logins = sys.argv[1], int(sys.argv[2])
+app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+with app.app_context():
+    init_db()
+    db.session.add(User(username='bench', password=hash_password('bench-password'), email='bench@example.com', role='user'))
+    db.session.commit()
+
+client = app.test_client()
+credentials = {'username': 'bench', 'password': 'bench-password'}
+refresh_token = client.post('/api/auth/login', json=credentials).get_json()['refresh_token']
+
+started = time.perf_counter()
+for _ in range(logins):
+    assert client.post('/api/auth/login', json=credentials).status_code == 200
+login_seconds = time.perf_counter() - started
+
+headers = {'Authorization': f'Bearer {refresh_token}'}
+started = time.perf_counter()
+for _ in range(logins):
+    assert client.post('/api/auth/refresh', headers=headers).status_code == 200
+refresh_seconds = time.perf_counter() - started
+
+print(json.dumps({'login': logins / login_seconds, 'refresh': logins / refresh_seconds}))
+"""
+
+
+def sample(method, logins, scratch):
+    database_url = f"sqlite:///{os.path.join(scratch, method.replace(':', '_'))}.db"
+    env = dict(os.environ, PASSWORD_HASH_METHOD=method, INIT_DB_ON_STARTUP='0')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE, database_url, str(logins)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--methods', nargs='+', default=[os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')],
+                        help='PASSWORD_HASH_METHOD values to compare')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for method in args.methods:
+            rates = sample(method, args.logins, scratch)
+            print(f"[INFO] {method}: {rates['login']:.1f} logins/s per core, "
+                  f"{rates['refresh']:.0f} token refreshes/s per core")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/startup.py
+"""
+Startup-time benchmark for create_app().
+
+Each sample runs in a fresh interpreter, the way a gunicorn worker or a
+Celery prefork child boots: it times `import app` and `create_app()`
+separately and reports the median over all runs. By default the lean
+startup is measured; --init-db also measures a first boot with schema
+creation and seeding (what every boot used to cost) for comparison.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 5 --init-db
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SAMPLE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+created = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported}))
+"""
+
+
+def sample(database_url, init_db):
+    env = dict(os.environ, INIT_DB_ON_STARTUP='1' if init_db else '0')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE, database_url],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(label, runs, init_db):
+    samples = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for run in range(runs):
+            # A fresh file per run, so --init-db pays for a first boot every time
+            database_url = f"sqlite:///{os.path.join(scratch, f'startup{run}.db')}"
+            samples.append(sample(database_url, init_db))
+
+    imports = statistics.median(s['import'] for s in samples) * 1000
+    creates = statistics.median(s['create_app'] for s in samples) * 1000
+    print(f"[INFO] {label}: import {imports:.0f} ms + create_app {creates:.0f} ms "
+          f"= {imports + creates:.0f} ms (median of {runs})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--init-db', action='store_true', help='also time startup with INIT_DB_ON_STARTUP=1')
+    args = parser.parse_args()
+
+    measure('lean startup', args.runs, init_db=False)
+    if args.init_db:
+        measure('init-db startup', args.runs, init_db=True)
+
+
+if __name__ == '__main__':
+    main()
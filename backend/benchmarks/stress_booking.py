@@ -0,0 +1,137 @@
+# benchmarks/stress_booking.py
+"""
+Concurrency stress test for /api/user/book.
+
+Seeds one lot and a batch of users into a scratch database, fires
+parallel booking requests at the lot (each user books twice), then checks
+that no spot or user ended up with more than one active reservation and
+that the lot counters still agree with the spot table.
+
+    python -m benchmarks.stress_booking --spots 500 --users 2000 --workers 32
+    python -m benchmarks.stress_booking --database-url postgresql://...
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, insert
+
+from app import create_app, db
+from app.models import User, ParkingLot, ParkingSpot, Reservation
+from app.seed import init_db
+
+
+def seed(lot_spots, user_count):
+    lot = ParkingLot(
+        name='Stress Lot',
+        address='1 Benchmark Road',
+        pin_code='000000',
+        price_per_hour=10.0,
+        total_spots=lot_spots,
+        available_count=lot_spots,
+        occupied_count=0
+    )
+    db.session.add(lot)
+    db.session.flush()
+    db.session.execute(insert(ParkingSpot), [{'lot_id': lot.id, 'status': 'A'} for _ in range(lot_spots)])
+    db.session.execute(insert(User), [
+        {'username': f'stress{i}', 'password': 'x', 'email': f'stress{i}@example.com', 'role': 'user'}
+        for i in range(user_count)
+    ])
+    db.session.commit()
+    user_ids = [row.id for row in db.session.query(User.id).filter(User.username.like('stress%'))]
+    return lot.id, user_ids
+
+
+def check_invariants(lot_id):
+    errors = []
+    active = db.session.query(Reservation.spot_id, Reservation.user_id).filter(Reservation.end_time.is_(None)).all()
+
+    double_spots = [spot for spot, n in Counter(r.spot_id for r in active).items() if n > 1]
+    double_users = [user for user, n in Counter(r.user_id for r in active).items() if n > 1]
+    if double_spots:
+        errors.append(f"{len(double_spots)} spots booked more than once")
+    if double_users:
+        errors.append(f"{len(double_users)} users hold more than one active reservation")
+
+    occupied = ParkingSpot.query.filter_by(lot_id=lot_id, status='O').count()
+    if occupied != len(active):
+        errors.append(f"{occupied} occupied spots but {len(active)} active reservations")
+
+    lot = db.session.get(ParkingLot, lot_id)
+    available = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').count()
+    if (lot.available_count, lot.occupied_count) != (available, occupied):
+        errors.append(
+            f"lot counters {lot.available_count}/{lot.occupied_count} "
+            f"do not match spots {available}/{occupied}"
+        )
+    return len(active), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spots', type=int, default=500)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--attempts-per-user', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--database-url', help='defaults to a scratch SQLite file')
+    args = parser.parse_args()
+
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        database_url = f'sqlite:///{scratch.name}'
+
+    # 32 writers on one SQLite file queue on its lock; give them room to wait
+    os.environ.setdefault('SQLITE_BUSY_TIMEOUT_MS', '30000')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    client = app.test_client()
+
+    with app.app_context():
+        init_db()
+        lot_id, user_ids = seed(args.spots, args.users)
+        # Each user books with their own access token, as the frontend does
+        headers = {
+            user_id: {'Authorization': f"Bearer {create_access_token(identity=str(user_id), additional_claims={'role': 'user'})}"}
+            for user_id in user_ids
+        }
+
+    def book(user_id):
+        return client.post('/api/user/book', json={'lot_id': lot_id, 'user_id': user_id},
+                           headers=headers[user_id]).status_code
+
+    requests = [uid for uid in user_ids for _ in range(args.attempts_per_user)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        statuses = Counter(pool.map(book, requests))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        active, errors = check_invariants(lot_id)
+        expected = min(args.spots, args.users)
+        if statuses[200] != expected or active != expected:
+            errors.append(f"expected {expected} bookings, got {statuses[200]} responses / {active} reservations")
+        db.session.remove()
+        db.engine.dispose()
+
+    print(f"[INFO] {len(requests)} booking requests in {elapsed:.2f}s ({len(requests) / elapsed:.0f} req/s)")
+    print(f"[INFO] Status codes: {dict(sorted(statuses.items()))}")
+
+    if scratch:
+        os.unlink(scratch.name)
+
+    if errors:
+        for error in errors:
+            print(f"[ERROR] {error}")
+        sys.exit(1)
+    print("[INFO] No double bookings detected")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/whatsapp_stub.py
+"""
+Local stand-in for the Fonnte /send API, plus a dispatch benchmark.
+
+Run the stub on its own and point the app at it:
+
+    python -m benchmarks.whatsapp_stub --serve --port 8025
+    FONNTE_API_URL=http://127.0.0.1:8025/send celery -A celery_worker.celery worker
+
+Or benchmark the dispatcher against an in-process stub:
+
+    python -m benchmarks.whatsapp_stub --messages 500 --latency 0.2 --fail-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from app.services.notification_dispatcher import TokenBucket, WhatsAppDispatcher
+from app.services.whatsapp_service import WhatsAppService
+
+
+class FonnteStubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    received = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        fields = {key: values[0] for key, values in parse_qs(body).items()}
+        time.sleep(self.latency)
+
+        if random.random() < self.fail_rate:
+            self._reply(503, {'status': False, 'reason': 'stub injected failure'})
+            return
+
+        targets = fields.get('target', '').split(',')
+        with self.lock:
+            self.received.append(fields)
+        self._reply(200, {
+            'status': True,
+            'detail': 'success! message in queue',
+            'id': [random.randint(1, 10 ** 9) for _ in targets],
+            'target': targets
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, fail_rate=0.0):
+    """Start the stub in a daemon thread; returns (server, send_url)"""
+    handler = type('Handler', (FonnteStubHandler,), {
+        'latency': latency, 'fail_rate': fail_rate, 'received': []
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/send'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fonnte API stub and dispatch benchmark')
+    parser.add_argument('--serve', action='store_true', help='only run the stub server')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate', type=float, default=100.0, help='token bucket rate (msg/s)')
+    parser.add_argument('--latency', type=float, default=0.1, help='stub response delay (s)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of 503 replies')
+    args = parser.parse_args()
+
+    server, url = start_stub(args.port, args.latency, args.fail_rate)
+    if args.serve:
+        print(f"[INFO] Fonnte stub listening on {url}")
+        server.serve_forever()
+        return
+
+    service = WhatsAppService(
+        base_url=url,
+        rate_limiter=TokenBucket(args.rate, args.workers),
+        backoff=0.05
+    )
+    dispatcher = WhatsAppDispatcher(service, max_workers=args.workers)
+    numbers = [f'98{i:08d}' for i in range(args.messages)]
+
+    started = time.perf_counter()
+    results = dispatcher.map(lambda number: service.send_message([number], 'benchmark'), numbers)
+    elapsed = time.perf_counter() - started
+
+    sent = sum(1 for r in results if isinstance(r, dict) and r['success'])
+    print(f"[INFO] {sent}/{args.messages} messages delivered in {elapsed:.2f}s "
+          f"({args.messages / elapsed:.1f} msg/s, {args.workers} workers, limit {args.rate}/s)")
+    print(f"[INFO] Stub received {len(server.RequestHandlerClass.received)} successful requests")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
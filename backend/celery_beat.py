@@ -3,6 +3,7 @@ from app import create_app
 from app.tasks.celery_config import celery
 from celery.schedules import crontab
 from app.tasks.daily_reminder import send_daily_reminders, send_weekly_summary
+from app.tasks.notification_outbox import drain_notification_outbox
 
 flask_app = create_app()
 
@@ -16,7 +17,15 @@ celery.conf.beat_schedule = {
     },
     'weekly-summaries': {
         'task': 'app.tasks.daily_reminder.send_weekly_summary',
-        'schedule': crontab(day_of_week=0, hour=10, minute=0),  # Every Sunday at 10:00 AM
+        'schedule': crontab(day_of_week=1, hour=10, minute=0),  # Every Monday at 10:00 AM, for the week just ended
+    },
+    'period-summaries': {
+        'task': 'app.tasks.daily_reminder.refresh_summaries',
+        'schedule': crontab(minute=15),  # Every hour at :15
+    },
+    'notification-outbox': {
+        'task': 'app.tasks.notification_outbox.drain_notification_outbox',
+        'schedule': 5.0,  # Every 5 seconds
     },
 }
 
@@ -1,6 +1,11 @@
 # celery_worker.py
 from app import create_app
 from app.tasks.celery_config import celery
+from app.tasks.notification_outbox import drain_notification_outbox
+from app import task_telemetry
+
+# Feeds the task_prerun/postrun/failure handlers into /metrics
+task_telemetry.connect_signals()
 
 flask_app = create_app()
 
@@ -0,0 +1,15 @@
+# gunicorn.conf.py
+# Read by `gunicorn run:app` from this directory. Availability streams
+# (Server-Sent Events) stay open for as long as a dashboard is, so workers
+# are gevent-based: an open stream costs a greenlet, not a whole worker.
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('GUNICORN_WORKERS', str(min(4, multiprocessing.cpu_count() * 2))))
+# Concurrent requests, streams included, per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# Streams send a heartbeat every SSE_HEARTBEAT_SECONDS, well inside this
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+accesslog = '-'
@@ -0,0 +1,42 @@
+"""indexes for hot query predicates
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.create_index('ix_parking_spot_lot_status', ['lot_id', 'status'], unique=False)
+
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_user_start', ['user_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_reservation_user_end', ['user_id', 'end_time'], unique=False)
+        batch_op.create_index('ix_reservation_end_time', ['end_time'], unique=False)
+        batch_op.create_index(
+            'ix_reservation_active_user', ['user_id', 'spot_id'], unique=False,
+            sqlite_where=sa.text('end_time IS NULL'),
+            postgresql_where=sa.text('end_time IS NULL')
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_active_user')
+        batch_op.drop_index('ix_reservation_end_time')
+        batch_op.drop_index('ix_reservation_user_end')
+        batch_op.drop_index('ix_reservation_user_start')
+
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_spot_lot_status')
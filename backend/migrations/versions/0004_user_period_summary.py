@@ -0,0 +1,41 @@
+"""user period summary
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_period_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('reservations', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('total_hours', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('total_cost', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'period_start', 'user_id', name='uq_user_period_summary')
+    )
+    with op.batch_alter_table('user_period_summary', schema=None) as batch_op:
+        batch_op.create_index('ix_user_period_summary_user', ['user_id', 'period', 'period_start'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_period_summary', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_period_summary_user')
+
+    op.drop_table('user_period_summary')
@@ -0,0 +1,32 @@
+"""drop the redundant partial active-reservation index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Active-reservation lookups (user_id = ? AND end_time IS NULL) are
+    # served by ix_reservation_user_end; this index only added write cost
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_index('ix_reservation_active_user')
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_reservation_active_user', ['user_id', 'spot_id'], unique=False,
+            sqlite_where=sa.text('end_time IS NULL'),
+            postgresql_where=sa.text('end_time IS NULL')
+        )
@@ -0,0 +1,46 @@
+"""parking lot availability counters
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def _spot_count(status):
+    return sa.text(
+        "(SELECT COUNT(*) FROM parking_spot"
+        " WHERE parking_spot.lot_id = parking_lot.id AND parking_spot.status = '%s')" % status
+    )
+
+
+def upgrade():
+    # Databases migrated with an earlier copy of 0001 already have the columns
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('parking_lot')}
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        if 'available_count' not in existing:
+            batch_op.add_column(sa.Column('available_count', sa.Integer(), nullable=False, server_default='0'))
+        if 'occupied_count' not in existing:
+            batch_op.add_column(sa.Column('occupied_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Start from the spots' real state rather than the zero default
+    parking_lot = sa.table('parking_lot', sa.column('available_count'), sa.column('occupied_count'))
+    op.execute(parking_lot.update().values(
+        available_count=_spot_count('A'),
+        occupied_count=_spot_count('O')
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        batch_op.drop_column('occupied_count')
+        batch_op.drop_column('available_count')
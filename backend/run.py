@@ -1,5 +1,11 @@
+import os
 from app import create_app
 
+# The development server sets up the database itself unless told not to;
+# production servers import `app` and rely on `flask init-db` / `flask seed`
+if __name__ == "__main__":
+    os.environ.setdefault('INIT_DB_ON_STARTUP', '1')
+
 app = create_app()
 
 if __name__ == "__main__":
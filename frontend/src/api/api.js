@@ -6,4 +6,39 @@ const api = axios.create({
   withCredentials: true  // 🔥 Important for session, cookies, CORS
 })
 
+api.interceptors.request.use(config => {
+  const token = localStorage.getItem('access_token')
+  if (token && !config.headers.Authorization) {
+    config.headers.Authorization = `Bearer ${token}`
+  }
+  return config
+})
+
+// On a 401, trade the refresh token for a new access token and retry once,
+// so an expired access token never sends the user back to the login form
+let refreshing = null
+api.interceptors.response.use(null, async error => {
+  const config = error.config
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (error.response?.status !== 401 || !refreshToken || config._retried || config.url.startsWith('/api/auth/')) {
+    throw error
+  }
+  refreshing = refreshing || api
+    .post('/api/auth/refresh', null, { headers: { Authorization: `Bearer ${refreshToken}` } })
+    .finally(() => { refreshing = null })
+  const res = await refreshing
+  localStorage.setItem('access_token', res.data.access_token)
+  config._retried = true
+  config.headers.Authorization = `Bearer ${res.data.access_token}`
+  return api(config)
+})
+
+// Fetch one page of a keyset-paged list. Pass `next` back as `after` to
+// get the following page; it is null on the last one. Totals sent with the
+// first page (X-Total-*) are in `headers`.
+export async function getPage(url, params = {}) {
+  const res = await api.get(url, { params })
+  return { items: res.data, next: res.headers['x-next-cursor'] || null, headers: res.headers }
+}
+
 export default api
@@ -0,0 +1,31 @@
+// src/api/availability.js
+import api from './api'
+
+// Reopen delay after the server refuses the stream (e.g. 503 when full)
+const REOPEN_MS = 30000
+
+// Open the lot availability stream. onSnapshot gets every lot's counts
+// once per (re)connect; onUpdate gets one lot whenever it changes.
+export function subscribeAvailability({ onSnapshot, onUpdate }) {
+  let source
+  let timer
+  const open = () => {
+    source = new EventSource(`${api.defaults.baseURL}/api/user/availability-stream`, {
+      withCredentials: true
+    })
+    source.addEventListener('snapshot', (event) => onSnapshot && onSnapshot(JSON.parse(event.data)))
+    source.addEventListener('availability', (event) => onUpdate && onUpdate(JSON.parse(event.data)))
+    // EventSource reconnects by itself after a dropped connection, but gives
+    // up on an error response; retry those later. The server resends a snapshot.
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        timer = setTimeout(open, REOPEN_MS)
+      }
+    }
+  }
+  open()
+  return () => {
+    clearTimeout(timer)
+    source.close()
+  }
+}